@@ -5,6 +5,7 @@ import sys
 try:
     from src.tasks.classify_themes import ThemeClassificationTask
     from config.settings import get_settings
+    from src.logging_setup import configure_logging
 except ImportError as e:
     print("=" * 70)
     print("ERROR: Missing required packages")
@@ -13,11 +14,7 @@ except ImportError as e:
     sys.exit(1)
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -40,10 +37,6 @@ if __name__ == "__main__":
         logger.error("3. Pass as argument: GOOGLE_API_KEY=your-api-key python3 run_classify.py")
         sys.exit(1)
     
-    # Override settings with environment variable if provided
-    if os.getenv('GOOGLE_API_KEY'):
-        settings.google_api_key = api_key
-    
     try:
         task = ThemeClassificationTask()
         stats = task.execute()
@@ -4,26 +4,23 @@ import sys
 
 # Check for required packages
 try:
-    from sqlalchemy import create_engine, func
-    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy import func
     from src.tasks.fetch_reviews import ReviewFetchTask
+    from src.database.engine import get_sessionmaker
     from src.database.models import Review
     from config.settings import get_settings
+    from src.logging_setup import configure_logging
 except ImportError as e:
     print("=" * 70)
     print("ERROR: Missing required packages")
     print("=" * 70)
     print("Please install required packages:")
-    print("  pip install sqlalchemy psycopg2-binary google-play-scraper app-store-scraper beautifulsoup4 pydantic-settings python-dotenv")
+    print("  pip install sqlalchemy psycopg2-binary google-play-scraper app-store-scraper beautifulsoup4 python-dotenv")
     print(f"\nMissing: {e}")
     sys.exit(1)
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -46,18 +43,16 @@ if __name__ == "__main__":
         logger.info("=" * 70)
         
         # Check total reviews in database
-        session = task.SessionLocal()
-        total_count = session.query(func.count(Review.id)).scalar()
-        app_store_count = session.query(func.count(Review.id)).filter(Review.platform == 'app_store').scalar()
-        google_play_count = session.query(func.count(Review.id)).filter(Review.platform == 'google_play').scalar()
+        with get_sessionmaker(task.database_url)() as session:
+            total_count = session.query(func.count(Review.id)).scalar()
+            app_store_count = session.query(func.count(Review.id)).filter(Review.platform == 'app_store').scalar()
+            google_play_count = session.query(func.count(Review.id)).filter(Review.platform == 'google_play').scalar()
         
         logger.info(f"\nTotal Reviews in Database: {total_count}")
         logger.info(f"  - App Store: {app_store_count}")
         logger.info(f"  - Google Play: {google_play_count}")
         logger.info("=" * 70)
         
-        session.close()
-        
     except Exception as e:
         logger.error(f"Error: {e}")
         import traceback
@@ -4,13 +4,11 @@ import sys
 import os
 from datetime import datetime, timedelta
 from src.tasks.generate_weekly_report import GenerateWeeklyReportTask
+from src.reporting.weekly_report_generator import report_word_count
 from config.settings import get_settings
+from src.logging_setup import configure_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -44,15 +42,7 @@ def print_report(report: dict):
     
     print("\n" + "=" * 70)
     
-    # Word count
-    text_parts = [
-        report.get("title", ""),
-        report.get("overview", ""),
-        " ".join([t.get("summary", "") for t in report.get("themes", [])]),
-        " ".join([q.get("text", "") for q in report.get("quotes", [])]),
-        " ".join([a.get("text", "") for a in report.get("actions", [])])
-    ]
-    word_count = len(" ".join(text_parts).split())
+    word_count = report_word_count(report)
     print(f"Word Count: {word_count} / 250")
     print("=" * 70 + "\n")
 
@@ -5,12 +5,9 @@ import os
 from datetime import datetime, timedelta
 from src.orchestrator.weekly_pipeline import WeeklyPipeline, run_pipeline
 from config.settings import get_settings
+from src.logging_setup import configure_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -30,21 +27,23 @@ def main():
         sys.exit(1)
     
     # Parse command line arguments
+    argv = sys.argv[1:]
+    flags = {arg for arg in argv if arg.startswith("-")}
+    positionals = [arg for arg in argv if not arg.startswith("-")]
+    
     week_start = None
     week_end = None
-    skip_email = "--skip-email" in sys.argv or "-s" in sys.argv
-    force_refresh = "--force-refresh" in sys.argv or "-f" in sys.argv
+    skip_email = not flags.isdisjoint({"--skip-email", "-s"})
+    force_refresh = not flags.isdisjoint({"--force-refresh", "-f"})
     
-    if len(sys.argv) > 1:
-        args = [arg for arg in sys.argv[1:] if arg not in ["--skip-email", "-s", "--force-refresh", "-f"]]
-        if len(args) >= 2:
-            try:
-                # Format: YYYY-MM-DD
-                week_start = datetime.strptime(args[0], "%Y-%m-%d")
-                week_end = datetime.strptime(args[1], "%Y-%m-%d")
-            except ValueError:
-                logger.error("Invalid date format. Use: YYYY-MM-DD")
-                sys.exit(1)
+    if len(positionals) >= 2:
+        try:
+            # Format: YYYY-MM-DD
+            week_start = datetime.strptime(positionals[0], "%Y-%m-%d")
+            week_end = datetime.strptime(positionals[1], "%Y-%m-%d")
+        except ValueError:
+            logger.error("Invalid date format. Use: YYYY-MM-DD")
+            sys.exit(1)
     
     try:
         results = run_pipeline(
@@ -4,12 +4,9 @@ import sys
 import os
 from src.scheduler.pipeline_scheduler import run_scheduler
 from config.settings import get_settings
+from src.logging_setup import configure_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -28,7 +25,8 @@ def main():
         logger.error("Please set it in .env file: GOOGLE_API_KEY=your-api-key")
         sys.exit(1)
     
-    skip_email = "--skip-email" in sys.argv or "-s" in sys.argv
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("-")}
+    skip_email = not flags.isdisjoint({"--skip-email", "-s"})
     
     logger.info("Starting scheduler...")
     logger.info(f"Configuration:")
@@ -5,12 +5,9 @@ import os
 from datetime import datetime, timedelta
 from src.tasks.send_weekly_email import SendWeeklyEmailTask
 from config.settings import get_settings
+from src.logging_setup import configure_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -42,25 +39,28 @@ if __name__ == "__main__":
         logger.error("Please set it in .env file: GOOGLE_API_KEY=your-api-key")
         sys.exit(1)
     
+    # Parse command line arguments
+    argv = sys.argv[1:]
+    flags = {arg for arg in argv if arg.startswith("-")}
+    positionals = [arg for arg in argv if not arg.startswith("-")]
+    
     # Check for dry-run flag
-    dry_run = "--dry-run" in sys.argv or "-d" in sys.argv
+    dry_run = not flags.isdisjoint({"--dry-run", "-d"})
     
-    # Parse command line arguments
     week_start = None
     week_end = None
     report_id = None
     
-    if len(sys.argv) > 1 and sys.argv[1] not in ["--dry-run", "-d"]:
-        if len(sys.argv) >= 3:
-            try:
-                # Format: YYYY-MM-DD
-                week_start = datetime.strptime(sys.argv[1], "%Y-%m-%d")
-                week_end = datetime.strptime(sys.argv[2], "%Y-%m-%d")
-            except ValueError:
-                # Try as report ID
-                report_id = sys.argv[1]
-        else:
-            report_id = sys.argv[1]
+    if len(positionals) >= 2:
+        try:
+            # Format: YYYY-MM-DD
+            week_start = datetime.strptime(positionals[0], "%Y-%m-%d")
+            week_end = datetime.strptime(positionals[1], "%Y-%m-%d")
+        except ValueError:
+            # Try as report ID
+            report_id = positionals[0]
+    elif positionals:
+        report_id = positionals[0]
     
     try:
         task = SendWeeklyEmailTask(api_key=google_api_key)
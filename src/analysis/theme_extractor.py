@@ -4,12 +4,29 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from src.llm.gemini_client import GeminiClient
-from src.database.models import Review, Theme, ReviewTheme
+from src.database.models import Review, Theme, ReviewTheme, ClassificationCache, ThemeExtractionCache
 from src.database.repository import ReviewRepository
+import hashlib
+import itertools
 import logging
+import queue
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.rate_limiter import TokenBucket
+from config.settings import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Gemini free tier allows 15 requests/minute; stay a little under it
+LLM_REQUESTS_PER_MINUTE = 13
+LLM_MAX_CONCURRENCY = 4
+
+# Reviews the theme extraction prompt actually includes
+THEME_SAMPLE_SIZE = 100
+
+# Marks the end of a batch's classification stream
+_STREAM_END = object()
 
 
 class ThemeExtractor:
@@ -20,6 +37,12 @@ class ThemeExtractor:
         self.repository = ReviewRepository(session)
         self.gemini_client = GeminiClient()
         self.default_theme_name = "General Feedback"
+        self._default_theme: Optional[Theme] = None
+        self.rate_limiter = TokenBucket(rate=LLM_REQUESTS_PER_MINUTE / 60, capacity=2)
+    
+    def close(self):
+        """Release the Gemini client's connections and worker threads."""
+        self.gemini_client.close()
     
     def extract_themes_from_reviews(self, reviews: List[Review], max_themes: int = 5) -> List[Theme]:
         """
@@ -34,23 +57,55 @@ class ThemeExtractor:
         """
         logger.info(f"Extracting themes from {len(reviews)} reviews")
         
-        # Prepare review data for LLM
+        # Prepare review data for LLM; repeated texts ("great app") would only
+        # crowd out distinct reviews from the prompt's sample
         review_data = []
+        sample_ids = set()
+        seen_texts = set()
         for review in reviews:
+            text = review.cleaned_text or review.review_text or ""
+            if text in seen_texts:
+                continue
+            seen_texts.add(text)
+            if len(review_data) < THEME_SAMPLE_SIZE:
+                sample_ids.add(str(review.id))
             review_data.append({
                 'review_text': review.review_text,
                 'cleaned_text': review.cleaned_text,
                 'rating': review.rating
             })
         
-        # Call LLM to extract themes
-        try:
-            result = self.gemini_client.extract_themes(review_data, max_themes=max_themes)
-            themes_data = result.get("themes", [])
-        except Exception as e:
-            logger.error(f"Error extracting themes: {e}")
-            # Fallback: create default theme
-            return [self._get_or_create_default_theme()]
+        # Themes drift slowly week to week; reuse a recent extraction whose
+        # review sample mostly overlaps this one instead of calling the LLM
+        themes_data = self._find_cached_themes(sample_ids, max_themes)
+        if themes_data is None:
+            try:
+                result = self.gemini_client.extract_themes(review_data, max_themes=max_themes)
+                themes_data = result.get("themes", [])
+            except Exception as e:
+                logger.error(f"Error extracting themes: {e}")
+                # Fallback: create default theme
+                return [self._get_or_create_default_theme()]
+            
+            if themes_data:
+                self.session.add(ThemeExtractionCache(
+                    max_themes=max_themes,
+                    review_ids=sorted(sample_ids),
+                    themes=themes_data
+                ))
+        
+        # Look up all existing themes in a single query
+        incoming_names = [
+            theme_data.get("name", "").strip()
+            for theme_data in themes_data
+            if theme_data.get("name", "").strip()
+        ]
+        existing_themes = {}
+        if incoming_names:
+            existing_themes = {
+                theme.name: theme
+                for theme in self.session.query(Theme).filter(Theme.name.in_(incoming_names))
+            }
         
         # Create or get Theme objects
         themes = []
@@ -59,13 +114,11 @@ class ThemeExtractor:
             if not theme_name:
                 continue
             
-            # Check if theme already exists
-            existing_theme = self.session.query(Theme).filter(
-                Theme.name == theme_name
-            ).first()
+            existing_theme = existing_themes.get(theme_name)
             
             if existing_theme:
-                themes.append(existing_theme)
+                if existing_theme not in themes:
+                    themes.append(existing_theme)
             else:
                 # Create new theme
                 theme = Theme(
@@ -73,6 +126,7 @@ class ThemeExtractor:
                     description=theme_data.get("description", "")
                 )
                 self.session.add(theme)
+                existing_themes[theme_name] = theme
                 themes.append(theme)
         
         self.session.commit()
@@ -111,95 +165,230 @@ class ThemeExtractor:
         
         # Process reviews in batches
         theme_counts = {theme.name: 0 for theme in themes}
+        theme_by_name = {theme.name: theme for theme in themes}
         unclassified_count = 0
         
-        import time
+        # Reviews whose text was already classified against this theme set are
+        # answered from the cache instead of the LLM
+        themes_fp = hashlib.blake2b(
+            ",".join(sorted(theme.name for theme in themes)).encode(),
+            digest_size=8
+        ).hexdigest()
+        cached_keys = set()
+        pending_cache_keys = {}
+        # Identical texts in this run are sent to the LLM once; the rest reuse
+        # the representative's theme once it has been classified
+        queued_keys = set()
+        resolved_themes = {}
         
+        # Prepare review data for every batch up front so LLM calls can overlap
+        batches = []
         for i in range(0, len(reviews), batch_size):
             batch = reviews[i:i + batch_size]
-            batch_num = i//batch_size + 1
-            logger.info(f"Processing batch {batch_num} ({len(batch)} reviews)")
-            
-            # Rate limiting: Free tier allows 15 requests/minute
-            # Add delay between batches to stay under limit (4+ seconds between batches)
-            if batch_num > 1:
-                delay = 4.5  # 4.5 seconds = ~13 requests/minute (safe margin)
-                logger.debug(f"Waiting {delay}s before next batch (rate limiting)")
-                time.sleep(delay)
+            batch_keys = {
+                review.id: self._classification_cache_key(themes_fp, review)
+                for review in batch
+            }
+            cached_themes = {
+                entry.cache_key: entry.theme_name
+                for entry in self.session.query(ClassificationCache).filter(
+                    ClassificationCache.cache_key.in_(set(batch_keys.values()))
+                )
+            }
+            cached_keys.update(cached_themes)
             
-            # Prepare review data
             review_data = []
+            cached_classifications = []
+            duplicate_reviews = []
             for review in batch:
+                cache_key = batch_keys[review.id]
+                if cache_key in cached_themes:
+                    cached_classifications.append({
+                        'review_id': str(review.id),
+                        'theme_name': cached_themes[cache_key]
+                    })
+                    continue
+                pending_cache_keys[review.id] = cache_key
+                if cache_key in queued_keys:
+                    duplicate_reviews.append(review)
+                    continue
+                queued_keys.add(cache_key)
                 review_data.append({
                     'id': str(review.id),
                     'review_text': review.review_text,
                     'cleaned_text': review.cleaned_text,
                     'rating': review.rating
                 })
-            
+            batches.append((batch, review_data, cached_classifications, duplicate_reviews))
+        
+        if cached_keys:
+            logger.info(f"Reusing cached classifications for {len(reviews) - len(pending_cache_keys)} reviews")
+        if len(queued_keys) < len(pending_cache_keys):
+            logger.info(f"Sending {len(queued_keys)} distinct texts for {len(pending_cache_keys)} unclassified reviews")
+        
+        def classify_batch(review_data, results):
+            # Stream classifications into the batch queue as they are decoded
             try:
-                # Classify batch
-                classifications = self.gemini_client.classify_reviews(
-                    review_data,
-                    themes_data
-                )
+                if review_data:
+                    # Rate limiting: Free tier allows 15 requests/minute
+                    self.rate_limiter.acquire()
+                    for classification in self.gemini_client.stream_classify(review_data, themes_data):
+                        results.put(classification)
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(_STREAM_END)
+        
+        def iter_duplicates(duplicate_reviews, batch_resolved, unresolved):
+            # Evaluated lazily, after the batch's own results, so representatives
+            # from this batch (and every earlier one) are already resolved.
+            # Duplicates of a representative that failed or was left out by the
+            # model are collected in unresolved so they are counted as such
+            for review in duplicate_reviews:
+                cache_key = pending_cache_keys[review.id]
+                theme_name = batch_resolved.get(cache_key, resolved_themes.get(cache_key))
+                if theme_name is None:
+                    unresolved.append(review)
+                    continue
+                yield {'review_id': str(review.id), 'theme_name': theme_name}
+        
+        def iter_results(results):
+            while True:
+                item = results.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        
+        # LLM calls run on worker threads; DB writes stay on this thread
+        # because the SQLAlchemy session is not thread-safe
+        with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as executor:
+            result_queues = [queue.Queue() for _ in batches]
+            for (_, review_data, _, _), results in zip(batches, result_queues):
+                executor.submit(classify_batch, review_data, results)
+            
+            for batch_num, ((batch, _, cached_classifications, duplicate_reviews), results) in enumerate(zip(batches, result_queues), 1):
+                logger.info(f"Processing batch {batch_num} ({len(batch)} reviews)")
                 
-                # Process classifications
-                for classification in classifications:
-                    review_id_str = classification.get("review_id", "")
-                    theme_name = classification.get("theme_name", "").strip()
-                    reason = classification.get("reason", "")
+                # Each batch runs in a savepoint so a failing batch is rolled
+                # back without discarding the rest of the run
+                savepoint = self.session.begin_nested()
+                # Run-level tallies only take this batch's updates once its
+                # savepoint commits, so a rolled back batch leaves no trace
+                batch_theme_counts = {}
+                batch_resolved = {}
+                batch_cache_keys = set()
+                batch_unclassified = 0
+                unresolved_duplicates = []
+                try:
+                    # Classifications are handled as they stream in, overlapping
+                    # DB work with LLM generation
+                    classifications = itertools.chain(
+                        cached_classifications, iter_results(results),
+                        iter_duplicates(duplicate_reviews, batch_resolved, unresolved_duplicates)
+                    )
+                    
+                    # The batch's reviews are already loaded; prefetch existing
+                    # classifications for the whole batch in one query
+                    reviews_map = {review.id: review for review in batch}
+                    reviews_by_id_str = {str(review.id): review for review in batch}
+                    existing_map = {
+                        rt.review_id: rt for rt in self.session.query(ReviewTheme).filter(
+                            ReviewTheme.review_id.in_(list(reviews_map))
+                        )
+                    }
+                    
+                    new_review_themes = []
+                    new_cache_entries = []
                     
-                    # Find review
-                    try:
-                        review_id = uuid.UUID(review_id_str)
-                        review = self.session.get(Review, review_id)
+                    # Process classifications
+                    for classification in classifications:
+                        review_id_str = classification.get("review_id", "")
+                        theme_name = classification.get("theme_name", "").strip()
+                        reason = classification.get("reason", "")
+                        
+                        # Find review: exact ID string first, parse only non-canonical IDs
+                        review = reviews_by_id_str.get(review_id_str)
+                        if review is None:
+                            try:
+                                review = reviews_map.get(uuid.UUID(review_id_str))
+                            except (ValueError, TypeError, AttributeError):
+                                logger.warning(f"Invalid review ID in classification: {review_id_str}")
+                                batch_unclassified += 1
+                                continue
                         
                         if not review:
                             logger.warning(f"Review {review_id_str} not found")
                             continue
                         
-                        # Find theme
-                        theme = next((t for t in themes if t.name == theme_name), None)
-                        
-                        if not theme:
-                            # Invalid theme - use default
-                            logger.warning(f"Invalid theme '{theme_name}', using default")
-                            theme = self._get_or_create_default_theme()
-                            theme_name = theme.name
-                        
-                        # Check if already classified
-                        existing = self.session.query(ReviewTheme).filter(
-                            ReviewTheme.review_id == review.id
-                        ).first()
+                        try:
+                            # Find theme
+                            theme = theme_by_name.get(theme_name)
+                            
+                            if not theme:
+                                # Invalid theme - use default
+                                logger.warning(f"Invalid theme '{theme_name}', using default")
+                                theme = self._get_or_create_default_theme()
+                                theme_name = theme.name
+                            
+                            # Check if already classified
+                            existing = existing_map.get(review.id)
+                            
+                            if existing:
+                                # Update existing
+                                existing.theme_id = theme.id
+                            else:
+                                # Create new classification
+                                review_theme = ReviewTheme(
+                                    review_id=review.id,
+                                    theme_id=theme.id,
+                                    confidence_score=0.8  # Default confidence
+                                )
+                                new_review_themes.append(review_theme)
+                                existing_map[review.id] = review_theme
+                            
+                            cache_key = pending_cache_keys.get(review.id)
+                            if cache_key:
+                                batch_resolved[cache_key] = theme_name
+                            if cache_key and cache_key not in cached_keys and cache_key not in batch_cache_keys:
+                                new_cache_entries.append(
+                                    ClassificationCache(cache_key=cache_key, theme_name=theme_name)
+                                )
+                                batch_cache_keys.add(cache_key)
+                            
+                            batch_theme_counts[theme_name] = batch_theme_counts.get(theme_name, 0) + 1
                         
-                        if existing:
-                            # Update existing
-                            existing.theme_id = theme.id
-                        else:
-                            # Create new classification
-                            review_theme = ReviewTheme(
-                                review_id=review.id,
-                                theme_id=theme.id,
-                                confidence_score=0.8  # Default confidence
-                            )
-                            self.session.add(review_theme)
-                        
-                        theme_counts[theme_name] = theme_counts.get(theme_name, 0) + 1
-                        
-                    except (ValueError, Exception) as e:
-                        logger.warning(f"Error processing classification for {review_id_str}: {e}")
-                        unclassified_count += 1
-                        continue
+                        except Exception as e:
+                            logger.warning(f"Error processing classification for {review_id_str}: {e}")
+                            batch_unclassified += 1
+                            continue
+                    
+                    batch_unclassified += len(unresolved_duplicates)
+                    
+                    if new_review_themes:
+                        self.session.bulk_save_objects(new_review_themes)
+                    if new_cache_entries:
+                        self.session.add_all(new_cache_entries)
+                    savepoint.commit()
                 
-                self.session.commit()
+                except Exception as e:
+                    logger.error(f"Error classifying batch: {e}")
+                    savepoint.rollback()
+                    # The default theme may have been created inside the rolled back savepoint
+                    self._default_theme = None
+                    # Mark reviews as unclassified
+                    unclassified_count += len(batch)
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Error classifying batch: {e}")
-                # Mark reviews as unclassified
-                for review in batch:
-                    unclassified_count += 1
-                continue
+                for theme_name, count in batch_theme_counts.items():
+                    theme_counts[theme_name] = theme_counts.get(theme_name, 0) + count
+                resolved_themes.update(batch_resolved)
+                cached_keys.update(batch_cache_keys)
+                unclassified_count += batch_unclassified
+        
+        # Single commit for the whole run
+        self.session.commit()
         
         logger.info(f"Classification complete. Theme counts: {theme_counts}")
         if unclassified_count > 0:
@@ -224,36 +413,76 @@ class ThemeExtractor:
         Returns:
             List of theme dictionaries with counts
         """
-        # Query theme counts
+        # Aggregate on the narrow theme_id key only; names are fetched afterwards
+        review_count = func.count(ReviewTheme.review_id).label('review_count')
         theme_counts = self.session.query(
-            Theme.name,
-            Theme.description,
-            func.count(ReviewTheme.id).label('count')
-        ).join(
-            ReviewTheme, Theme.id == ReviewTheme.theme_id
+            ReviewTheme.theme_id,
+            review_count
         ).join(
             Review, ReviewTheme.review_id == Review.id
         ).filter(
-            Review.review_date >= start_date,
-            Review.review_date <= end_date
+            Review.review_date.between(start_date, end_date)
         ).group_by(
-            Theme.id, Theme.name, Theme.description
+            ReviewTheme.theme_id
         ).order_by(
-            func.count(ReviewTheme.id).desc()
+            review_count.desc()
         ).limit(top_n).all()
         
+        if not theme_counts:
+            return []
+        
+        themes_by_id = {
+            theme.id: theme
+            for theme in self.session.query(Theme).filter(
+                Theme.id.in_([theme_id for theme_id, _ in theme_counts])
+            )
+        }
+        
         result = []
-        for name, description, count in theme_counts:
+        for theme_id, count in theme_counts:
+            theme = themes_by_id.get(theme_id)
+            if not theme:
+                continue
             result.append({
-                'name': name,
-                'description': description or '',
+                'name': theme.name,
+                'description': theme.description or '',
                 'count': count
             })
         
         return result
     
+    def _find_cached_themes(self, sample_ids: set, max_themes: int) -> Optional[List[Dict[str, Any]]]:
+        """Return themes from a recent extraction over a mostly identical review sample."""
+        min_overlap = settings.theme_cache_min_overlap
+        if min_overlap <= 0 or not sample_ids:
+            return None
+        
+        recent = self.session.query(ThemeExtractionCache).filter(
+            ThemeExtractionCache.max_themes == max_themes
+        ).order_by(
+            ThemeExtractionCache.created_at.desc()
+        ).limit(settings.theme_cache_lookback)
+        
+        for entry in recent:
+            cached_ids = set(entry.review_ids or ())
+            overlap = len(sample_ids & cached_ids) / len(sample_ids | cached_ids)
+            if overlap >= min_overlap:
+                logger.info(f"Reusing themes extracted on {entry.created_at:%Y-%m-%d} ({overlap:.0%} sample overlap)")
+                return entry.themes
+        return None
+    
+    @staticmethod
+    def _classification_cache_key(themes_fp: str, review: Review) -> str:
+        """Build the classification cache key for a review."""
+        text = review.cleaned_text or review.review_text or ""
+        text_hash = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{themes_fp}:{text_hash}"
+    
     def _get_or_create_default_theme(self) -> Theme:
-        """Get or create default theme for unclassified reviews."""
+        """Get or create default theme for unclassified reviews (cached per extractor)."""
+        if self._default_theme is not None:
+            return self._default_theme
+        
         default_theme = self.session.query(Theme).filter(
             Theme.name == self.default_theme_name
         ).first()
@@ -264,7 +493,8 @@ class ThemeExtractor:
                 description="General user feedback and app experience"
             )
             self.session.add(default_theme)
-            self.session.commit()
+            self.session.flush()
         
+        self._default_theme = default_theme
         return default_theme
 
@@ -1,5 +1,20 @@
 """Database package."""
-from src.database.models import Base, Review, Theme, ReviewTheme, WeeklyReport
-
-__all__ = ["Base", "Review", "Theme", "ReviewTheme", "WeeklyReport"]
+from src.database.models import (
+    Base,
+    Review,
+    Theme,
+    ReviewTheme,
+    WeeklyReport,
+    ClassificationCache,
+    ThemeExtractionCache,
+)
 
+__all__ = [
+    "Base",
+    "Review",
+    "Theme",
+    "ReviewTheme",
+    "WeeklyReport",
+    "ClassificationCache",
+    "ThemeExtractionCache",
+]
@@ -0,0 +1,95 @@
+"""Shared SQLAlchemy engine and session factory."""
+from functools import lru_cache
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from config.settings import get_settings
+from src.database.models import Base
+
+settings = get_settings()
+
+SQLITE_FALLBACK_URL = "sqlite:///reviews.db"
+
+
+@lru_cache()
+def get_engine(database_url: str) -> Engine:
+    """Get the process-wide engine for a database URL."""
+    engine_kwargs = {
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        # Rows per multi-VALUES statement for executemany INSERTs
+        "insertmanyvalues_page_size": 1000,
+    }
+    if not database_url.startswith("sqlite"):
+        # SQLite pools are per-file/per-thread; sizing only applies to server databases
+        engine_kwargs["pool_size"] = settings.database_pool_size
+        engine_kwargs["max_overflow"] = settings.database_max_overflow
+    if database_url.startswith(("postgresql://", "postgresql+psycopg2://")):
+        engine_kwargs["executemany_mode"] = "values_plus_batch"
+    engine = create_engine(database_url, **engine_kwargs)
+    if database_url.startswith("sqlite") and ":memory:" not in database_url:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so each commit appends to the log instead of rewriting pages and fsyncing twice."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@lru_cache()
+def resolve_database_url(database_url: str) -> str:
+    """
+    Fall back to the local SQLite database when PostgreSQL isn't set up.
+    
+    Localhost PostgreSQL URLs (including the placeholder default) are probed
+    once per process, through the shared engine so a reachable database
+    keeps its warm pool.
+    """
+    if not database_url:
+        return SQLITE_FALLBACK_URL
+    if database_url.startswith("postgresql://") and "localhost" in database_url:
+        try:
+            with get_engine(database_url).connect():
+                pass
+        except Exception:
+            return SQLITE_FALLBACK_URL
+    return database_url
+
+
+@lru_cache()
+def ensure_schema(database_url: str):
+    """Create missing tables once per process; later calls skip the per-table existence checks."""
+    engine = get_engine(database_url)
+    _check_review_themes_schema(engine)
+    Base.metadata.create_all(engine)
+
+
+def _check_review_themes_schema(engine: Engine):
+    """
+    Refuse to run against a review_themes table from before the composite key.
+    
+    create_all never alters an existing table, and the old surrogate id
+    column is NOT NULL with only a Python-side default, so every insert
+    would fail and each classification batch would be rolled back quietly.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("review_themes"):
+        return
+    columns = {column["name"] for column in inspector.get_columns("review_themes")}
+    if "id" in columns:
+        raise RuntimeError(
+            "review_themes still has the legacy 'id' column; it is now keyed by "
+            "(review_id, theme_id). Migrate once with: DROP TABLE review_themes; "
+            "UPDATE reviews SET processed_at = NULL; the next classify run "
+            "recreates and repopulates it."
+        )
+
+
+@lru_cache()
+def get_sessionmaker(database_url: str) -> sessionmaker:
+    """Get the process-wide session factory for a database URL."""
+    return sessionmaker(bind=get_engine(database_url))
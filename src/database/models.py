@@ -1,6 +1,6 @@
 """Database models for reviews and related entities."""
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Float, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Float, Index, func, literal
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -8,6 +8,9 @@ import uuid
 
 Base = declarative_base()
 
+# Binary JSONB on PostgreSQL (parsed once, TOAST-compressed); plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Review(Base):
     """Review model storing individual app reviews."""
@@ -20,10 +23,11 @@ class Review(Base):
     review_text = Column(Text, nullable=False)  # Review body text
     review_date = Column(DateTime, nullable=False)  # When review was posted
     app_version = Column(String(50), nullable=True)  # App version if available
-    raw_data = Column(JSON, nullable=True)  # Original raw data for audit
+    raw_data = Column(JSONType, nullable=True)  # Original raw data for audit
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     processed_at = Column(DateTime, nullable=True)  # When review was processed for themes
     cleaned_text = Column(Text, nullable=True)  # Text after PII removal and cleaning
+    content_hash = Column(String(16), nullable=True)  # Dedup hash of platform, date and text
     
     # Relationships
     review_themes = relationship("ReviewTheme", back_populates="review", cascade="all, delete-orphan")
@@ -31,6 +35,7 @@ class Review(Base):
     # Indexes
     __table_args__ = (
         Index("idx_reviews_platform_date", "platform", "review_date"),
+        Index("idx_reviews_platform_content_hash", "platform", "content_hash", unique=True),
         Index("idx_reviews_date", "review_date"),
         Index("idx_reviews_processed", "processed_at"),
     )
@@ -39,6 +44,14 @@ class Review(Base):
         return f"<Review(id={self.id}, platform={self.platform}, rating={self.rating}, date={self.review_date})>"
 
 
+# Full-text search vector over cleaned review text; GIN-indexed on PostgreSQL only
+REVIEW_SEARCH_VECTOR = func.to_tsvector(
+    literal("english"),
+    func.coalesce(Review.__table__.c.cleaned_text, "")
+)
+Index("idx_reviews_search", REVIEW_SEARCH_VECTOR, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
 class Theme(Base):
     """Theme model for categorizing reviews."""
     __tablename__ = "themes"
@@ -59,9 +72,9 @@ class ReviewTheme(Base):
     """Many-to-many relationship between reviews and themes."""
     __tablename__ = "review_themes"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.id"), nullable=False)
-    theme_id = Column(UUID(as_uuid=True), ForeignKey("themes.id"), nullable=False)
+    # Composite primary key (review_id, theme_id) also serves review -> themes lookups
+    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.id"), primary_key=True)
+    theme_id = Column(UUID(as_uuid=True), ForeignKey("themes.id"), primary_key=True)
     confidence_score = Column(Float, nullable=True)  # LLM confidence in theme assignment
     
     # Relationships
@@ -70,14 +83,39 @@ class ReviewTheme(Base):
     
     # Indexes
     __table_args__ = (
-        Index("idx_review_themes_review", "review_id"),
-        Index("idx_review_themes_theme", "theme_id"),
+        Index("idx_review_themes_theme_review", "theme_id", "review_id"),
     )
     
     def __repr__(self):
         return f"<ReviewTheme(review_id={self.review_id}, theme_id={self.theme_id})>"
 
 
+class ClassificationCache(Base):
+    """Cached LLM theme assignment keyed by review text and theme set."""
+    __tablename__ = "review_classification_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # "<themes fingerprint>:<text hash>"
+    theme_name = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<ClassificationCache(cache_key={self.cache_key}, theme_name={self.theme_name})>"
+
+
+class ThemeExtractionCache(Base):
+    """Themes extracted for a review sample, reused while the sample barely changes."""
+    __tablename__ = "theme_extraction_cache"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    max_themes = Column(Integer, nullable=False)
+    review_ids = Column(JSONType, nullable=False)  # IDs of the reviews sent to the LLM
+    themes = Column(JSONType, nullable=False)  # Raw theme list returned by the LLM
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<ThemeExtractionCache(id={self.id}, max_themes={self.max_themes})>"
+
+
 class WeeklyReport(Base):
     """Weekly report model storing generated reports."""
     __tablename__ = "weekly_reports"
@@ -85,13 +123,15 @@ class WeeklyReport(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     week_start_date = Column(DateTime, nullable=False)
     week_end_date = Column(DateTime, nullable=False)
-    report_content = Column(JSON, nullable=False)  # Structured report data
+    report_content = Column(JSONType, nullable=False)  # Structured report data
     email_sent_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Indexes
     __table_args__ = (
         Index("idx_weekly_reports_dates", "week_start_date", "week_end_date"),
+        # Most recent report lookup (ORDER BY created_at DESC LIMIT 1) scans this backwards
+        Index("idx_weekly_reports_created", "created_at"),
     )
     
     def __repr__(self):
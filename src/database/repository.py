@@ -1,14 +1,59 @@
 """Database repository for review operations."""
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_
-from typing import List, Optional, Dict
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, and_, insert, update, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Iterable, Iterator, List, Optional, Dict
 from datetime import datetime
-from src.database.models import Review, Theme, ReviewTheme, WeeklyReport
+from itertools import islice
+from src.database.models import Review, Theme, ReviewTheme, WeeklyReport, REVIEW_SEARCH_VECTOR
 from config.settings import get_settings
+import hashlib
+import io
+import json
 import uuid
 
 settings = get_settings()
 
+# One extra IN query per level instead of one SELECT per review;
+# selectinload avoids the row explosion a joined one-to-many load would cause
+_REVIEW_THEMES_EAGER_LOAD = selectinload(Review.review_themes).selectinload(ReviewTheme.theme)
+
+# Batches at least this large are loaded with COPY on PostgreSQL (psycopg2);
+# smaller ones gain nothing over the executemany INSERT
+COPY_MIN_ROWS = 100
+
+# Review columns written by the COPY path, in buffer order
+_COPY_REVIEW_COLUMNS = (
+    "id", "platform", "rating", "title", "review_text", "review_date",
+    "app_version", "raw_data", "created_at", "cleaned_text", "content_hash",
+)
+
+# Characters that must be backslash-escaped in COPY's text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def compute_content_hash(platform: str, review_date: datetime, review_text: str) -> str:
+    """Compute the 16-character dedup hash stored in Review.content_hash."""
+    key = f"{platform}|{review_date.isoformat()}|{review_text or ''}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _copy_field(value) -> str:
+    """Format one value for COPY's text format (\\N is NULL)."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _batch_iterable(items: Iterable, n: int) -> Iterator[List]:
+    """Yield successive lists of at most ``n`` items from any iterable (generators included)."""
+    iterator = iter(items)
+    batch = list(islice(iterator, n))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, n))
+
 
 class ReviewRepository:
     """Repository for review database operations."""
@@ -36,10 +81,9 @@ class ReviewRepository:
             )
         )
         if review_text_hash:
-            # Could add hash field for better deduplication
-            pass
+            query = query.where(Review.content_hash == review_text_hash)
         result = self.session.execute(query)
-        return result.scalar_one_or_none()
+        return result.scalars().first()
     
     def get_reviews_by_date_range(
         self,
@@ -47,8 +91,8 @@ class ReviewRepository:
         end_date: datetime,
         platform: Optional[str] = None
     ) -> List[Review]:
-        """Get reviews within a date range."""
-        query = select(Review).where(
+        """Get reviews within a date range, with their theme assignments eager-loaded."""
+        query = select(Review).options(_REVIEW_THEMES_EAGER_LOAD).where(
             and_(
                 Review.review_date >= start_date,
                 Review.review_date <= end_date
@@ -61,47 +105,200 @@ class ReviewRepository:
         result = self.session.execute(query)
         return list(result.scalars().all())
     
+    def search_reviews(self, search_text: str, limit: int = 100) -> List[Review]:
+        """
+        Find reviews whose cleaned text matches the given search terms.
+        
+        Uses the GIN full-text index on PostgreSQL and a substring match elsewhere.
+        """
+        query = select(Review)
+        if self.session.get_bind().dialect.name == "postgresql":
+            ts_query = func.plainto_tsquery("english", search_text)
+            query = query.where(REVIEW_SEARCH_VECTOR.bool_op("@@")(ts_query))
+        else:
+            query = query.where(Review.cleaned_text.ilike(f"%{search_text}%"))
+        query = query.order_by(Review.review_date.desc()).limit(limit)
+        result = self.session.execute(query)
+        return list(result.scalars().all())
+    
     def get_unprocessed_reviews(self) -> List[Review]:
-        """Get reviews that haven't been processed for themes."""
-        query = select(Review).where(Review.processed_at.is_(None))
+        """Get reviews that haven't been processed for themes, with theme assignments eager-loaded."""
+        query = select(Review).options(_REVIEW_THEMES_EAGER_LOAD).where(Review.processed_at.is_(None))
         result = self.session.execute(query)
         return list(result.scalars().all())
     
+    def iter_unprocessed_reviews(self, chunk_size: int = 500) -> Iterator[Review]:
+        """
+        Stream unprocessed reviews in windows of ``chunk_size`` rows.
+        
+        Unlike get_unprocessed_reviews, only one window is held in memory at a time
+        (server-side cursor on PostgreSQL). Theme assignments are eager-loaded per window.
+        """
+        query = (
+            select(Review)
+            .options(_REVIEW_THEMES_EAGER_LOAD)
+            .where(Review.processed_at.is_(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        return self.session.execute(query).scalars()
+    
     def mark_review_processed(self, review_id: uuid.UUID):
         """Mark a review as processed."""
-        review = self.session.get(Review, review_id)
-        if review:
-            review.processed_at = datetime.utcnow()
+        self.mark_reviews_processed([review_id])
+    
+    def mark_reviews_processed(self, review_ids: Iterable[uuid.UUID]) -> int:
+        """Mark reviews as processed with set-based UPDATEs (one per batch of IDs)."""
+        # Local time from Python, like the rest of the tree (func.now() is UTC on SQLite)
+        processed_at = datetime.now()
+        updated_count = 0
+        for batch in _batch_iterable(review_ids, settings.bulk_create_batch_size):
+            result = self.session.execute(
+                update(Review)
+                .where(Review.id.in_(batch))
+                .values(processed_at=processed_at)
+            )
+            updated_count += result.rowcount
+        return updated_count
+    
+    def get_classified_review_ids(self, review_ids: Iterable[uuid.UUID]) -> List[uuid.UUID]:
+        """Return the subset of review_ids that have a theme assigned."""
+        classified_ids = []
+        for batch in _batch_iterable(review_ids, settings.bulk_create_batch_size):
+            result = self.session.execute(
+                select(ReviewTheme.review_id).where(ReviewTheme.review_id.in_(batch))
+            )
+            classified_ids.extend(result.scalars())
+        return classified_ids
+    
+    def backfill_content_hashes(self, batch_size: Optional[int] = None) -> int:
+        """
+        Fill in content_hash for reviews stored before the column existed.
+        
+        The unique (platform, content_hash) index never treats NULLs as
+        conflicting, so until legacy rows are hashed, re-fetched reviews
+        would be inserted again as duplicates. Returns the number of rows
+        updated; once every row has a hash this is one empty SELECT.
+        """
+        batch_size = batch_size or settings.bulk_create_batch_size
+        updated_count = 0
+        query = (
+            select(Review.id, Review.platform, Review.review_date, Review.review_text)
+            .where(Review.content_hash.is_(None))
+            .limit(batch_size)
+        )
+        while True:
+            rows = self.session.execute(query).all()
+            if not rows:
+                return updated_count
+            # ORM bulk UPDATE by primary key: one executemany per batch
+            self.session.execute(update(Review), [
+                {
+                    "id": review_id,
+                    "content_hash": compute_content_hash(platform, review_date, review_text)
+                }
+                for review_id, platform, review_date, review_text in rows
+            ])
+            self.commit()
+            updated_count += len(rows)
     
     def commit(self):
         """Commit the current transaction."""
         self.session.commit()
     
-    def bulk_create_reviews(self, reviews_data: List[Dict]) -> int:
-        """Bulk create reviews with deduplication."""
-        import json
-        from datetime import datetime
+    def bulk_create_reviews(self, reviews_data: Iterable[Dict], batch_size: Optional[int] = None) -> int:
+        """
+        Bulk create reviews with deduplication.
         
+        Rows are deduplicated, inserted and committed in slices of
+        ``batch_size`` to bound memory and stay under driver parameter limits.
+        ``reviews_data`` may be a generator; only one slice is materialized at a time.
+        """
+        batch_size = batch_size or settings.bulk_create_batch_size
         created_count = 0
+        for batch in _batch_iterable(reviews_data, batch_size):
+            created_count += self._create_reviews_batch(batch)
+        return created_count
+    
+    def _create_reviews_batch(self, reviews_data: List[Dict]) -> int:
+        """Insert one batch of reviews, letting the database skip duplicates."""
+        new_rows = []
         for review_data in reviews_data:
-            # Check if review already exists
-            existing = self.get_review_by_platform_and_date(
-                platform=review_data["platform"],
-                review_date=review_data["review_date"]
+            # Convert datetime objects in raw_data to strings for JSON serialization
+            raw_data = review_data.get("raw_data")
+            if raw_data:
+                review_data["raw_data"] = {
+                    raw_key: value.isoformat() if value.__class__ is datetime else value
+                    for raw_key, value in raw_data.items()
+                }
+            
+            review_data["content_hash"] = compute_content_hash(
+                review_data["platform"],
+                review_data["review_date"],
+                review_data.get("review_text", "")
             )
-            if not existing:
-                # Convert datetime objects in raw_data to strings for JSON serialization
-                if "raw_data" in review_data and review_data["raw_data"]:
-                    raw_data = review_data["raw_data"].copy()
-                    for key, value in raw_data.items():
-                        if isinstance(value, datetime):
-                            raw_data[key] = value.isoformat()
-                    review_data["raw_data"] = raw_data
-                
-                self.create_review(review_data)
-                created_count += 1
+            new_rows.append(review_data)
+        
+        if len(new_rows) >= COPY_MIN_ROWS and self._supports_copy():
+            created_count = self._copy_reviews(new_rows)
+        else:
+            # Core executemany INSERT (insertmanyvalues fast path), no ORM unit of work.
+            # Duplicates are skipped by the unique (platform, content_hash) index;
+            # RETURNING only yields the rows that were actually inserted.
+            result = self.session.execute(
+                self._insert_reviews_statement().returning(Review.id),
+                new_rows
+            )
+            created_count = len(result.all())
+        self.commit()
         
-        if created_count > 0:
-            self.commit()
         return created_count
-
+    
+    def _supports_copy(self) -> bool:
+        """Whether the session's database can load rows with COPY FROM STDIN."""
+        dialect = self.session.get_bind().dialect
+        return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+    
+    def _copy_reviews(self, rows: List[Dict]) -> int:
+        """
+        Load reviews with PostgreSQL COPY, skipping duplicates.
+        
+        COPY cannot skip conflicting rows, so the batch is copied into a
+        temporary table and moved over with one INSERT ... ON CONFLICT DO NOTHING.
+        """
+        created_at = datetime.utcnow()
+        buffer = io.StringIO()
+        for row in rows:
+            values = (
+                uuid.uuid4(), row["platform"], row.get("rating"), row.get("title"),
+                row["review_text"], row["review_date"], row.get("app_version"),
+                json.dumps(row.get("raw_data")), created_at, row.get("cleaned_text"),
+                row["content_hash"],
+            )
+            buffer.write("\t".join(map(_copy_field, values)))
+            buffer.write("\n")
+        buffer.seek(0)
+        
+        columns = ", ".join(_COPY_REVIEW_COLUMNS)
+        self.session.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS reviews_copy "
+            "(LIKE reviews INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        cursor = self.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY reviews_copy ({columns}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+        result = self.session.execute(text(
+            f"INSERT INTO reviews ({columns}) SELECT {columns} FROM reviews_copy "
+            "ON CONFLICT DO NOTHING RETURNING id"
+        ))
+        return len(result.all())
+    
+    def _insert_reviews_statement(self):
+        """Build a Review INSERT that skips rows conflicting with existing ones."""
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return pg_insert(Review).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite_insert(Review).on_conflict_do_nothing()
+        return insert(Review)
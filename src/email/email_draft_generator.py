@@ -1,12 +1,69 @@
 """Email draft generator for weekly reports."""
 import json
 import logging
+import re
 from typing import Dict, Any
 from datetime import datetime
 from src.llm.gemini_client import GeminiClient
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# Single-pass PII scrubber; alternatives are tried in this order at each position
+_PII_RE = re.compile(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'
+    r'|(?P<phone>(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})'
+    r'|(?P<phone_in>(?:\+91[-.\s]?)?[6-9]\d{9})'
+    r'|(?P<url>http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+)'
+)
+_PII_REPLACEMENTS = {
+    "email": "[EMAIL_REMOVED]",
+    "phone": "[PHONE_REMOVED]",
+    "phone_in": "[PHONE_REMOVED]",
+    "url": "[URL_REMOVED]",
+}
+
+# Leading ```lang line and optional closing ``` fence around an LLM response
+_FENCE_RE = re.compile(r'\A```[^\n]*\n?(.*?)(?:\n```)?\s*\Z', re.DOTALL)
+
+# Email body prompt; only the pulse JSON and product name vary per call
+_BODY_PROMPT = """You are drafting an internal weekly email sharing the latest product pulse.
+
+Audience:
+- Product & Growth: want to see what to fix or double down on.
+- Support: wants to know what to acknowledge and celebrate.
+- Leadership: wants a quick pulse, key risks, and wins.
+
+Input (weekly note JSON):
+{pulse_json}
+
+Tasks:
+- Write an email body only (no subject line).
+- Structure:
+  1) 2–3 line intro explaining the time window and the product/program ({product_name}).
+  2) Embed the weekly pulse note in a clean, scannable format:
+     - Title
+     - Overview
+     - Bulleted Top 3 themes
+     - Bulleted 3 quotes
+     - Bulleted 3 action ideas
+  3) End with a short closing line and invite replies.
+
+Constraints:
+- Professional, neutral tone with a hint of warmth.
+- No names, emails, or IDs. If present in quotes, anonymize generically
+  (e.g., "a learner", "one participant", "a user").
+- Keep the whole email under 350 words.
+- Use plain text formatting (no HTML, no markdown).
+- Use simple bullets (- or *) for lists.
+
+Output plain text only (no HTML, no markdown code blocks)."""
+
 
 class EmailDraftGenerator:
     """Generates email drafts from weekly pulse reports."""
@@ -17,24 +74,11 @@ class EmailDraftGenerator:
     
     def _call_gemini(self, prompt: str) -> str:
         """Helper method to call Gemini API."""
-        # Use HTTP client if available, otherwise use official package
-        if hasattr(self.gemini_client, 'use_http') and self.gemini_client.use_http:
-            response_text = self.gemini_client.http_client._make_request(
-                prompt,
-                response_format="text"
-            )["text"]
-        else:
-            response = self.gemini_client.model.generate_content(prompt)
-            response_text = response.text
+        response_text = self.gemini_client.generate(prompt, response_format="text")
         
         # Remove markdown code blocks if present
         if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines[-1].strip() == "```":
-                lines = lines[:-1]
-            response_text = "\n".join(lines).strip()
+            response_text = _FENCE_RE.match(response_text).group(1).strip()
         
         return response_text
     
@@ -78,40 +122,16 @@ class EmailDraftGenerator:
         week_start_str = week_start.strftime("%B %d")
         week_end_str = week_end.strftime("%B %d, %Y")
         
-        # Prepare weekly pulse JSON for prompt
-        pulse_json = json.dumps(weekly_pulse, indent=2)
+        # Prepare weekly pulse JSON for prompt (compact: indentation only costs tokens)
+        if HAS_ORJSON:
+            pulse_json = orjson.dumps(weekly_pulse).decode("utf-8")
+        else:
+            pulse_json = json.dumps(weekly_pulse, separators=(",", ":"), ensure_ascii=False)
         
-        prompt = f"""You are drafting an internal weekly email sharing the latest product pulse.
-
-Audience:
-- Product & Growth: want to see what to fix or double down on.
-- Support: wants to know what to acknowledge and celebrate.
-- Leadership: wants a quick pulse, key risks, and wins.
-
-Input (weekly note JSON):
-{pulse_json}
-
-Tasks:
-- Write an email body only (no subject line).
-- Structure:
-  1) 2–3 line intro explaining the time window and the product/program ({self.product_name}).
-  2) Embed the weekly pulse note in a clean, scannable format:
-     - Title
-     - Overview
-     - Bulleted Top 3 themes
-     - Bulleted 3 quotes
-     - Bulleted 3 action ideas
-  3) End with a short closing line and invite replies.
-
-Constraints:
-- Professional, neutral tone with a hint of warmth.
-- No names, emails, or IDs. If present in quotes, anonymize generically
-  (e.g., "a learner", "one participant", "a user").
-- Keep the whole email under 350 words.
-- Use plain text formatting (no HTML, no markdown).
-- Use simple bullets (- or *) for lists.
-
-Output plain text only (no HTML, no markdown code blocks)."""
+        prompt = _BODY_PROMPT.format_map({
+            "pulse_json": pulse_json,
+            "product_name": self.product_name,
+        })
         
         try:
             email_body = self._call_gemini(prompt)
@@ -174,19 +194,7 @@ Top Themes:
         Returns:
             Scrubbed text
         """
-        import re
-        
-        # Email patterns
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL_REMOVED]', text)
-        
-        # Phone patterns (including Indian)
-        text = re.sub(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', '[PHONE_REMOVED]', text)
-        text = re.sub(r'(\+91[-.\s]?)?[6-9]\d{9}', '[PHONE_REMOVED]', text)
-        
-        # URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[URL_REMOVED]', text)
-        
-        return text
+        return _PII_RE.sub(lambda match: _PII_REPLACEMENTS[match.lastgroup], text)
     
     def generate_email(
         self,
@@ -27,6 +27,45 @@ class EmailSender:
         self.smtp_user = smtp_user or getattr(settings, 'smtp_user', None)
         self.smtp_password = smtp_password or getattr(settings, 'smtp_password', None)
         self.from_email = from_email or settings.email_from
+        self._server: Optional[smtplib.SMTP] = None
+    
+    def __enter__(self) -> "EmailSender":
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _get_server(self) -> smtplib.SMTP:
+        """Return a logged-in SMTP connection, reconnecting if the server dropped it."""
+        if self._server is not None:
+            try:
+                self._server.noop()
+                return self._server
+            except smtplib.SMTPServerDisconnected:
+                logger.info("SMTP connection was closed by the server, reconnecting")
+                self._server = None
+        
+        logger.info(f"Connecting to SMTP server: {self.smtp_host}:{self.smtp_port}")
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        try:
+            server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        return server
+    
+    def close(self):
+        """Close the SMTP connection if one is open."""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except OSError:
+            self._server.close()
+        finally:
+            self._server = None
     
     def send_email(
         self,
@@ -69,16 +108,9 @@ class EmailSender:
             text_part = MIMEText(body, 'plain')
             msg.attach(text_part)
             
-            # Connect to SMTP server
-            logger.info(f"Connecting to SMTP server: {self.smtp_host}:{self.smtp_port}")
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            
-            # Send email
+            # Send email over the (reused) SMTP connection
             all_recipients = to_emails + (cc_emails or [])
-            server.send_message(msg, to_addrs=all_recipients)
-            server.quit()
+            self._get_server().send_message(msg, to_addrs=all_recipients)
             
             logger.info(f"Email sent successfully to {len(all_recipients)} recipients")
             
@@ -91,6 +123,8 @@ class EmailSender:
             
         except Exception as e:
             logger.error(f"Error sending email: {e}")
+            # Drop a possibly broken connection so the next send starts fresh
+            self.close()
             return {
                 "success": False,
                 "error": str(e),
@@ -112,7 +146,7 @@ class EmailSender:
         Returns:
             Send status dictionary
         """
-        recipients = recipients or settings.email_recipient_list
+        recipients = list(recipients or settings.email_recipient_list)
         
         if not recipients:
             logger.warning("No email recipients configured")
@@ -1,8 +1,11 @@
 """App Store review fetcher."""
 from app_store_scraper import AppStore
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import Iterator, List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config.settings import get_settings
+from src.ingestion.models import FetchedReview
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,32 @@ try:
 except ImportError:
     HAS_RSS_FETCHER = False
 
+# App name variants scraped at once after the primary name fails; Apple
+# rate-limits parallel scrapes aggressively
+APP_NAME_FALLBACK_WORKERS = 2
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_string(date_value: str) -> Optional[datetime]:
+    """
+    Parse an App Store date string, picking the format from its shape.
+    
+    Handles '%Y-%m-%d %H:%M:%S' / '%Y-%m-%d' (via fromisoformat), '%d %b %Y'
+    and '%B %d, %Y'. Returns None if the string matches none of them.
+    Offset-aware ISO strings are normalised to naive UTC.
+    """
+    try:
+        if date_value[:4].isdigit() and date_value[4:5] == '-':
+            parsed = datetime.fromisoformat(date_value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+        if date_value[:1].isdigit():
+            return datetime.strptime(date_value, '%d %b %Y')
+        return datetime.strptime(date_value, '%B %d, %Y')
+    except ValueError:
+        return None
+
 
 class AppStoreFetcher:
     """Fetcher for App Store reviews."""
@@ -28,7 +57,7 @@ class AppStoreFetcher:
         self,
         days_back: int = 84,
         max_reviews: Optional[int] = None
-    ) -> List[Dict]:
+    ) -> List[FetchedReview]:
         """
         Fetch reviews from App Store.
         
@@ -37,44 +66,24 @@ class AppStoreFetcher:
             max_reviews: Maximum number of reviews to fetch (None for all)
         
         Returns:
-            List of review dictionaries
+            List of FetchedReview records
         """
         try:
             logger.info(f"Fetching App Store reviews for app_id={self.app_id}, country={self.country}")
             
-            # Try multiple app name variations if first attempt fails
-            app_names_to_try = [
+            # Try the primary app name, then the other variants; first non-empty result wins
+            app_names_to_try = list(dict.fromkeys([
                 self.app_name,
                 "Groww: Stocks, Mutual Fund, IPO",
                 "Groww",
                 "groww"
-            ]
+            ]))
             
-            app = None
-            reviews_fetched = False
+            # Fetch reviews with smaller batches to avoid rate limiting
+            batch_size = min(max_reviews or 200, 200)  # Limit to 200 at a time
+            app_reviews = self._fetch_first_available(app_names_to_try, batch_size)
             
-            for app_name_attempt in app_names_to_try:
-                try:
-                    logger.info(f"Trying app_name: {app_name_attempt}")
-                    app = AppStore(
-                        country=self.country,
-                        app_name=app_name_attempt,
-                        app_id=self.app_id
-                    )
-                    
-                    # Fetch reviews with smaller batches to avoid rate limiting
-                    batch_size = min(max_reviews or 200, 200)  # Limit to 200 at a time
-                    app.review(how_many=batch_size)
-                    
-                    if app.reviews and len(app.reviews) > 0:
-                        reviews_fetched = True
-                        logger.info(f"Successfully fetched reviews with app_name: {app_name_attempt}")
-                        break
-                except Exception as e:
-                    logger.warning(f"Failed with app_name '{app_name_attempt}': {e}")
-                    continue
-            
-            if not reviews_fetched or not app or not app.reviews:
+            if not app_reviews:
                 logger.warning("Primary scraper failed. Trying RSS feed fallback...")
                 
                 # Try RSS feed as fallback
@@ -99,7 +108,7 @@ class AppStoreFetcher:
             reviews = []
             cutoff_date = datetime.now() - timedelta(days=days_back)
             
-            for review in app.reviews:
+            for review in app_reviews:
                 try:
                     # Parse review date
                     review_date = self._parse_date(review.get('date'))
@@ -108,20 +117,18 @@ class AppStoreFetcher:
                     if review_date < cutoff_date:
                         continue
                     
-                    review_dict = {
-                        'platform': 'app_store',
-                        'rating': review.get('rating'),
-                        'title': review.get('title', ''),
-                        'review_text': review.get('review', ''),
-                        'review_date': review_date,
-                        'app_version': review.get('appVersion'),
-                        'raw_data': {
+                    reviews.append(FetchedReview(
+                        platform='app_store',
+                        rating=review.get('rating'),
+                        title=review.get('title', ''),
+                        review_text=review.get('review', ''),
+                        review_date=review_date,
+                        app_version=review.get('appVersion'),
+                        raw_data={
                             'developer_response': review.get('developerResponse'),
                             'id': review.get('id'),
                         }
-                    }
-                    
-                    reviews.append(review_dict)
+                    ))
                     
                 except Exception as e:
                     logger.warning(f"Error processing App Store review: {e}")
@@ -134,23 +141,79 @@ class AppStoreFetcher:
             logger.error(f"Error fetching App Store reviews: {e}")
             raise
     
+    def fetch_reviews_iter(
+        self,
+        days_back: int = 84,
+        max_reviews: Optional[int] = None
+    ) -> Iterator[List[FetchedReview]]:
+        """
+        Fetch reviews from App Store as pages, mirroring GooglePlayFetcher.
+        
+        The scraper returns all reviews from one call, so they arrive as a
+        single page.
+        """
+        reviews = self.fetch_reviews(days_back=days_back, max_reviews=max_reviews)
+        if reviews:
+            yield reviews
+    
+    def _fetch_with_app_name(self, app_name: str, batch_size: int) -> List[Dict]:
+        """Fetch reviews using a single app_name variant."""
+        logger.info(f"Trying app_name: {app_name}")
+        app = AppStore(
+            country=self.country,
+            app_name=app_name,
+            app_id=self.app_id
+        )
+        app.review(how_many=batch_size)
+        return app.reviews or []
+    
+    def _fetch_first_available(self, app_names: List[str], batch_size: int) -> List[Dict]:
+        """
+        Return reviews for the first app_name variant that yields any.
+        
+        The primary name is tried alone, since it almost always works and Apple
+        rate-limits aggressively. Only if it comes back empty are the remaining
+        variants tried, at most APP_NAME_FALLBACK_WORKERS at a time; variants
+        still queued when one succeeds are cancelled.
+        """
+        primary, fallbacks = app_names[0], app_names[1:]
+        app_reviews = self._try_app_name(primary, batch_size)
+        if app_reviews or not fallbacks:
+            return app_reviews
+        
+        executor = ThreadPoolExecutor(max_workers=min(APP_NAME_FALLBACK_WORKERS, len(fallbacks)))
+        futures = {
+            executor.submit(self._try_app_name, app_name, batch_size): app_name
+            for app_name in fallbacks
+        }
+        try:
+            for future in as_completed(futures):
+                app_reviews = future.result()
+                if app_reviews:
+                    return app_reviews
+            return []
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _try_app_name(self, app_name: str, batch_size: int) -> List[Dict]:
+        """Fetch with one app_name variant, logging failures as an empty result."""
+        try:
+            app_reviews = self._fetch_with_app_name(app_name, batch_size)
+        except Exception as e:
+            logger.warning(f"Failed with app_name '{app_name}': {e}")
+            return []
+        if app_reviews:
+            logger.info(f"Successfully fetched reviews with app_name: {app_name}")
+        return app_reviews
+    
     def _parse_date(self, date_value) -> datetime:
         """Parse date from various formats."""
         if isinstance(date_value, datetime):
             return date_value
         if isinstance(date_value, str):
-            # Try common date formats
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d',
-                '%d %b %Y',
-                '%B %d, %Y'
-            ]
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_value, fmt)
-                except ValueError:
-                    continue
+            parsed = _parse_date_string(date_value)
+            if parsed is not None:
+                return parsed
         # Default to current date if parsing fails
         logger.warning(f"Could not parse date: {date_value}, using current date")
         return datetime.now()
@@ -159,7 +222,7 @@ class AppStoreFetcher:
         self,
         start_date: datetime,
         end_date: datetime
-    ) -> List[Dict]:
+    ) -> List[FetchedReview]:
         """
         Fetch reviews within a specific date range.
         
@@ -168,7 +231,7 @@ class AppStoreFetcher:
             end_date: End date for filtering
         
         Returns:
-            List of review dictionaries within date range
+            List of FetchedReview records within date range
         """
         # Calculate days back from end_date
         days_back = (datetime.now() - start_date).days + 7  # Add buffer
@@ -177,7 +240,7 @@ class AppStoreFetcher:
         # Filter by date range
         filtered_reviews = [
             review for review in all_reviews
-            if start_date <= review['review_date'] <= end_date
+            if start_date <= review.review_date <= end_date
         ]
         
         return filtered_reviews
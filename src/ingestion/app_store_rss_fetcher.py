@@ -1,13 +1,72 @@
 """Alternative App Store review fetcher using RSS feed."""
+import threading
+import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
-from typing import List, Dict
-from datetime import datetime
+from typing import BinaryIO, Iterator, List, Dict, Optional, Tuple
+from datetime import datetime, timezone
 import logging
 import re
 
+from src.ingestion.models import FetchedReview
+
+try:
+    from lxml import etree as LET
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    import ciso8601
+    HAS_CISO8601 = True
+except ImportError:
+    HAS_CISO8601 = False
+
 logger = logging.getLogger(__name__)
 
+# Fully qualified tag names, so lookups skip the namespace-map translation
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+ITUNES_NS = '{http://itunes.apple.com/rss}'
+ATOM_ENTRY = ATOM_NS + 'entry'
+ATOM_TITLE = ATOM_NS + 'title'
+ATOM_CONTENT = ATOM_NS + 'content'
+ATOM_UPDATED = ATOM_NS + 'updated'
+IM_RATING = ITUNES_NS + 'rating'
+IM_VERSION = ITUNES_NS + 'version'
+
+# Last successful response per (feed URL, max_reviews): (ETag, Last-Modified, reviews).
+# Fetchers are created per call, so the cache lives at module level.
+_feed_cache: Dict[Tuple[str, int], Tuple[Optional[str], Optional[str], List[FetchedReview]]] = {}
+_feed_cache_lock = threading.Lock()
+
+
+def _parse_iso_datetime(date_str: str) -> datetime:
+    """Parse an ISO 8601 timestamp, using the ciso8601 C parser when available."""
+    if HAS_CISO8601:
+        return ciso8601.parse_datetime(date_str)
+    return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+
+
+def _iter_entries(source: BinaryIO) -> Iterator:
+    """
+    Stream Atom <entry> elements out of an RSS payload file object.
+    
+    Each entry is yielded as soon as its end tag is parsed and cleared once the
+    caller moves on, so memory stays flat regardless of feed size.
+    """
+    if HAS_LXML:
+        for _, entry in LET.iterparse(source, events=('end',), tag=ATOM_ENTRY):
+            yield entry
+            entry.clear()
+            # Drop already-processed siblings still referenced by the root
+            while entry.getprevious() is not None:
+                del entry.getparent()[0]
+    else:
+        for _, elem in ET.iterparse(source, events=('end',)):
+            if elem.tag == ATOM_ENTRY:
+                yield elem
+                elem.clear()
+
 
 class AppStoreRSSFetcher:
     """Fetch App Store reviews using RSS feed (fallback method)."""
@@ -16,7 +75,7 @@ class AppStoreRSSFetcher:
         self.app_id = app_id
         self.country = country
     
-    def fetch_reviews(self, max_reviews: int = 500) -> List[Dict]:
+    def fetch_reviews(self, max_reviews: int = 500) -> List[FetchedReview]:
         """
         Fetch reviews from App Store RSS feed.
         
@@ -24,7 +83,7 @@ class AppStoreRSSFetcher:
             max_reviews: Maximum number of reviews to fetch
         
         Returns:
-            List of review dictionaries
+            List of FetchedReview records
         """
         reviews = []
         
@@ -37,74 +96,93 @@ class AppStoreRSSFetcher:
             req = urllib.request.Request(base_url)
             req.add_header('User-Agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
             
-            with urllib.request.urlopen(req, timeout=10) as response:
-                xml_data = response.read().decode('utf-8')
-            
-            # Parse XML
-            root = ET.fromstring(xml_data)
-            
-            # Namespace handling
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'im': 'http://itunes.apple.com/rss'
-            }
+            # Conditional request: an unchanged feed comes back as an empty 304
+            cache_key = (base_url, max_reviews)
+            with _feed_cache_lock:
+                cached = _feed_cache.get(cache_key)
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    req.add_header('If-None-Match', etag)
+                if last_modified:
+                    req.add_header('If-Modified-Since', last_modified)
             
-            # Find all entry elements
-            entries = root.findall('.//atom:entry', ns)
+            entry_count = 0
+            parse_entry = self._parse_entry
+            append_review = reviews.append
             
-            logger.info(f"Found {len(entries)} entries in RSS feed")
-            
-            for entry in entries[:max_reviews]:
-                try:
-                    # Extract review data
-                    title_elem = entry.find('atom:title', ns)
-                    content_elem = entry.find('atom:content', ns)
-                    rating_elem = entry.find('.//im:rating', ns)
-                    date_elem = entry.find('atom:updated', ns)
-                    version_elem = entry.find('.//im:version', ns)
-                    
-                    if content_elem is None or (content_elem.text is None or not content_elem.text.strip()):
-                        continue
-                    
-                    review_text = content_elem.text.strip()
-                    title = title_elem.text if title_elem is not None and title_elem.text else None
-                    rating = int(rating_elem.text) if rating_elem is not None and rating_elem.text else None
-                    
-                    # Parse date
-                    date_str = date_elem.text if date_elem is not None else None
-                    if date_str:
-                        # ISO 8601 format: 2025-11-22T10:30:00-07:00
+            try:
+                with urllib.request.urlopen(req, timeout=10) as response:
+                    # Parse while the body streams in; the parser reads the encoding declaration
+                    for entry in _iter_entries(response):
+                        if entry_count >= max_reviews:
+                            break
+                        entry_count += 1
+                        
+                        # A malformed entry is skipped without dropping the rest of the feed
                         try:
-                            review_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                            # Convert to timezone-naive datetime (UTC)
-                            if review_date.tzinfo:
-                                review_date = review_date.astimezone().replace(tzinfo=None)
-                        except Exception as e:
-                            logger.warning(f"Date parsing error: {e}, using current date")
-                            review_date = datetime.now()
-                    else:
-                        review_date = datetime.now()
-                    
-                    app_version = version_elem.text if version_elem is not None and version_elem.text else None
-                    
-                    reviews.append({
-                        'platform': 'app_store',
-                        'rating': rating,
-                        'title': title,
-                        'review_text': review_text,
-                        'review_date': review_date,
-                        'app_version': app_version,
-                        'raw_data': {}
-                    })
+                            review = parse_entry(entry)
+                        except (ValueError, TypeError, AttributeError) as e:
+                            logger.warning(f"Error parsing RSS entry: {e}")
+                            continue
+                        if review:
+                            append_review(review)
                     
-                except Exception as e:
-                    logger.warning(f"Error parsing review entry: {e}")
-                    continue
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or not cached:
+                    raise
+                logger.info("App Store RSS feed not modified, reusing cached reviews")
+                return list(cached[2])
             
+            if etag or last_modified:
+                with _feed_cache_lock:
+                    _feed_cache[cache_key] = (etag, last_modified, list(reviews))
+            
+            logger.info(f"Found {entry_count} entries in RSS feed")
             logger.info(f"Fetched {len(reviews)} App Store reviews from RSS feed")
             return reviews
             
         except Exception as e:
             logger.error(f"Error fetching App Store RSS reviews: {e}")
             return []
-
+    
+    def _parse_entry(self, entry) -> Optional[FetchedReview]:
+        """Convert one Atom <entry> into a FetchedReview (None if it has no text)."""
+        # Extract review data (findtext gives '' for empty elements, None if missing)
+        findtext = entry.findtext
+        review_text = findtext(ATOM_CONTENT)
+        if not review_text or not review_text.strip():
+            return None
+        
+        review_text = review_text.strip()
+        title = findtext(ATOM_TITLE) or None
+        rating_text = findtext(IM_RATING)
+        rating = int(rating_text) if rating_text and rating_text.isdigit() else None
+        date_str = findtext(ATOM_UPDATED)
+        app_version = findtext(IM_VERSION) or None
+        
+        # Parse date
+        if date_str:
+            # ISO 8601 format: 2025-11-22T10:30:00-07:00
+            try:
+                review_date = _parse_iso_datetime(date_str)
+                # Convert to timezone-naive datetime (UTC)
+                if review_date.tzinfo:
+                    review_date = review_date.astimezone(timezone.utc).replace(tzinfo=None)
+            except ValueError as e:
+                logger.warning(f"Date parsing error: {e}, using current date")
+                review_date = datetime.now()
+        else:
+            review_date = datetime.now()
+        
+        return FetchedReview(
+            platform='app_store',
+            rating=rating,
+            title=title,
+            review_text=review_text,
+            review_date=review_date,
+            app_version=app_version,
+            raw_data={}
+        )
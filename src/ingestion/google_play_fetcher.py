@@ -1,14 +1,34 @@
 """Google Play Store review fetcher."""
 from google_play_scraper import app, reviews, Sort
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import get_settings
+from src.ingestion.models import FetchedReview
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def _first_index_before(reviews_newest_first: List[FetchedReview], boundary: datetime, inclusive: bool) -> int:
+    """
+    Binary search a newest-first review list for the first review at/before a date.
+    
+    Returns the index of the first review whose date is <= boundary
+    (inclusive) or < boundary (exclusive), or len(reviews) if there is none.
+    """
+    lo, hi = 0, len(reviews_newest_first)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        review_date = reviews_newest_first[mid].review_date
+        if review_date > boundary or (not inclusive and review_date == boundary):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
 class GooglePlayFetcher:
     """Fetcher for Google Play Store reviews."""
     
@@ -20,7 +40,7 @@ class GooglePlayFetcher:
         self,
         days_back: int = 84,
         max_reviews: Optional[int] = None
-    ) -> List[Dict]:
+    ) -> List[FetchedReview]:
         """
         Fetch reviews from Google Play Store.
         
@@ -29,78 +49,121 @@ class GooglePlayFetcher:
             max_reviews: Maximum number of reviews to fetch (None for all)
         
         Returns:
-            List of review dictionaries
+            List of FetchedReview records
+        """
+        return [
+            review
+            for page in self.fetch_reviews_iter(days_back=days_back, max_reviews=max_reviews)
+            for review in page
+        ]
+    
+    def fetch_reviews_iter(
+        self,
+        days_back: int = 84,
+        max_reviews: Optional[int] = None
+    ) -> Iterator[List[FetchedReview]]:
+        """
+        Fetch reviews from Google Play Store one API page at a time.
+        
+        Args:
+            days_back: Number of days to look back (default: 84 for 12 weeks)
+            max_reviews: Maximum number of reviews to fetch (None for all)
+        
+        Yields:
+            Lists of FetchedReview records, newest first, one per fetched page
         """
         try:
             logger.info(f"Fetching Google Play reviews for app_id={self.app_id}, country={self.country}")
             
-            reviews_list = []
-            continuation_token = None
             cutoff_date = datetime.now() - timedelta(days=days_back)
             max_fetch = max_reviews or 5000
             fetched_count = 0
             
-            while fetched_count < max_fetch:
-                # Fetch batch of reviews
-                result, continuation_token = reviews(
-                    self.app_id,
-                    lang='en',  # Language
-                    country=self.country,
-                    sort=Sort.NEWEST,  # Sort by newest first
-                    count=200,  # Fetch 200 at a time
-                    continuation_token=continuation_token
-                )
-                
-                if not result:
-                    break
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                next_page = executor.submit(self._fetch_page, None)
                 
-                for review in result:
-                    try:
-                        # Parse review date
-                        review_date = self._parse_timestamp(review.get('at'))
-                        
-                        # Skip if review is too old
-                        if review_date < cutoff_date:
-                            # Since we're sorting by newest, we can break early
-                            continuation_token = None
-                            break
-                        
-                        review_dict = {
-                            'platform': 'google_play',
-                            'rating': review.get('score'),
-                            'title': None,  # Google Play doesn't have separate titles
-                            'review_text': review.get('content', ''),
-                            'review_date': review_date,
-                            'app_version': review.get('appVersion'),
-                            'raw_data': {
-                                'reply_content': review.get('replyContent'),
-                                'reply_at': review.get('repliedAt'),
-                                'thumbs_up': review.get('thumbsUpCount'),
-                                'id': review.get('reviewId'),
-                            }
-                        }
-                        
-                        reviews_list.append(review_dict)
-                        fetched_count += 1
-                        
-                        if fetched_count >= max_fetch:
-                            break
+                while next_page is not None:
+                    result, continuation_token = next_page.result()
+                    next_page = None
+                    
+                    if not result:
+                        break
+                    
+                    # Since we're sorting by newest, everything after the first
+                    # too-old review is too old as well; stop at that boundary
+                    in_range_count = self._count_newer_than(result, cutoff_date)
+                    reached_cutoff = in_range_count < len(result)
+                    
+                    # Pages are chained by continuation token, so only one request can be
+                    # in flight; start the next one now so it overlaps with this page's parsing
+                    if (continuation_token and not reached_cutoff
+                            and fetched_count + len(result) < max_fetch):
+                        next_page = executor.submit(self._fetch_page, continuation_token)
+                    
+                    reviews_list = []
+                    for review in result[:min(in_range_count, max_fetch - fetched_count)]:
+                        try:
+                            # Parse review date (google-play-scraper already returns datetimes)
+                            review_date = review.get('at')
+                            if review_date.__class__ is not datetime:
+                                review_date = self._parse_timestamp(review_date)
                             
-                    except Exception as e:
-                        logger.warning(f"Error processing Google Play review: {e}")
-                        continue
-                
-                # Break if no more reviews
-                if not continuation_token:
-                    break
+                            reviews_list.append(FetchedReview(
+                                platform='google_play',
+                                rating=review.get('score'),
+                                title=None,  # Google Play doesn't have separate titles
+                                review_text=review.get('content', ''),
+                                review_date=review_date,
+                                app_version=review.get('appVersion'),
+                                raw_data={
+                                    'reply_content': review.get('replyContent'),
+                                    'reply_at': review.get('repliedAt'),
+                                    'thumbs_up': review.get('thumbsUpCount'),
+                                    'id': review.get('reviewId'),
+                                }
+                            ))
+                            fetched_count += 1
+                            
+                        except Exception as e:
+                            logger.warning(f"Error processing Google Play review: {e}")
+                            continue
+                    
+                    # Fetch the next page now if it was not prefetched but is still needed
+                    if (next_page is None and continuation_token
+                            and not reached_cutoff and fetched_count < max_fetch):
+                        next_page = executor.submit(self._fetch_page, continuation_token)
+                    
+                    if reviews_list:
+                        yield reviews_list
             
-            logger.info(f"Fetched {len(reviews_list)} Google Play reviews")
-            return reviews_list
+            logger.info(f"Fetched {fetched_count} Google Play reviews")
             
         except Exception as e:
             logger.error(f"Error fetching Google Play reviews: {e}")
             raise
     
+    def _fetch_page(self, continuation_token):
+        """Fetch one page of newest-first reviews."""
+        return reviews(
+            self.app_id,
+            lang='en',  # Language
+            country=self.country,
+            sort=Sort.NEWEST,  # Sort by newest first
+            count=200,  # Fetch 200 at a time
+            continuation_token=continuation_token
+        )
+    
+    def _count_newer_than(self, page: List[Dict], cutoff_date: datetime) -> int:
+        """Binary search a newest-first page for how many reviews are at/after the cutoff."""
+        lo, hi = 0, len(page)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._parse_timestamp(page[mid].get('at')) >= cutoff_date:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
     def _parse_timestamp(self, timestamp) -> datetime:
         """Parse timestamp to datetime."""
         if isinstance(timestamp, datetime):
@@ -118,7 +181,7 @@ class GooglePlayFetcher:
         self,
         start_date: datetime,
         end_date: datetime
-    ) -> List[Dict]:
+    ) -> List[FetchedReview]:
         """
         Fetch reviews within a specific date range.
         
@@ -127,17 +190,15 @@ class GooglePlayFetcher:
             end_date: End date for filtering
         
         Returns:
-            List of review dictionaries within date range
+            List of FetchedReview records within date range
         """
         # Calculate days back from end_date
         days_back = (datetime.now() - start_date).days + 7  # Add buffer
         all_reviews = self.fetch_reviews(days_back=days_back)
         
-        # Filter by date range
-        filtered_reviews = [
-            review for review in all_reviews
-            if start_date <= review['review_date'] <= end_date
-        ]
+        # fetch_reviews returns newest first, so the range is one contiguous slice
+        first = _first_index_before(all_reviews, end_date, inclusive=True)
+        last = _first_index_before(all_reviews, start_date, inclusive=False)
         
-        return filtered_reviews
+        return all_reviews[first:last]
 
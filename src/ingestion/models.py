@@ -0,0 +1,19 @@
+"""Record types shared by the review fetchers and processor."""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class FetchedReview(NamedTuple):
+    """
+    One store review as returned by a fetcher, before cleaning.
+    
+    A tuple with named fields rather than a dict: roughly half the memory
+    per review and attribute access instead of key lookups.
+    """
+    platform: str
+    rating: Optional[int]
+    title: Optional[str]
+    review_text: str
+    review_date: datetime
+    app_version: Optional[str]
+    raw_data: dict
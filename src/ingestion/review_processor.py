@@ -1,8 +1,10 @@
 """Review processor for cleaning and filtering reviews."""
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime, timedelta
+from itertools import compress
 from src.utils.pii_remover import PIIRemover
 from src.utils.language_detector import LanguageDetector
+from src.ingestion.models import FetchedReview
 from config.settings import get_settings
 import logging
 
@@ -28,7 +30,7 @@ class ReviewProcessor:
     
     def process_reviews(
         self,
-        reviews: List[Dict],
+        reviews: List[FetchedReview],
         weeks_min: Optional[int] = None,
         weeks_max: Optional[int] = None
     ) -> List[Dict]:
@@ -36,94 +38,110 @@ class ReviewProcessor:
         Process reviews: filter by date range and clean text.
         
         Args:
-            reviews: List of raw review dictionaries
+            reviews: List of FetchedReview records from the fetchers
             weeks_min: Minimum weeks to look back (default: from settings)
             weeks_max: Maximum weeks to look back (default: from settings)
         
         Returns:
             List of processed review dictionaries
         """
+        return list(self.iter_processed_reviews(reviews, weeks_min=weeks_min, weeks_max=weeks_max))
+    
+    def iter_processed_reviews(
+        self,
+        reviews: List[FetchedReview],
+        weeks_min: Optional[int] = None,
+        weeks_max: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Like process_reviews, but yield each processed review as it is built.
+        
+        Lets the repository insert rows without a second full list of
+        processed dictionaries being held alongside the fetched records.
+        """
         weeks_min = weeks_min or settings.review_weeks_lookback_min
         weeks_max = weeks_max or settings.review_weeks_lookback_max
         
         # Calculate date range
-        end_date = datetime.now() - timedelta(weeks=1)  # Up to last week
-        start_date = datetime.now() - timedelta(weeks=weeks_max)
+        now = datetime.now()
+        end_date = now - timedelta(weeks=1)  # Up to last week
+        start_date = now - timedelta(weeks=weeks_max)
         
         logger.info(f"Processing reviews from {start_date.date()} to {end_date.date()}")
         
-        processed_reviews = []
-        
-        for review in reviews:
-            try:
-                # Filter by date range
-                review_date = review.get('review_date')
-                if not isinstance(review_date, datetime):
-                    logger.warning(f"Invalid review date: {review_date}")
-                    continue
-                
-                if not (start_date <= review_date <= end_date):
-                    continue
-                
-                # Clean text
-                review_text = review.get('review_text', '')
-                title = review.get('title', '')
-                
-                # Filter: Check word count (must have more than min_words)
-                word_count = self.language_detector.count_words(review_text)
-                if word_count <= self.min_words:
-                    logger.debug(f"Skipping review with {word_count} words (min: {self.min_words + 1})")
-                    continue
-                
-                # Filter: Check if English (if english_only is enabled)
-                if self.english_only and not self.language_detector.is_english(review_text):
-                    logger.debug(f"Skipping non-English review: {review_text[:50]}...")
-                    continue
-                
-                cleaned_text = self.pii_remover.clean_text(review_text)
-                cleaned_title = self.pii_remover.clean_text(title) if title else None
-                
-                # Skip if text is empty after cleaning
-                if not cleaned_text.strip():
-                    logger.warning("Review text is empty after cleaning, skipping")
-                    continue
-                
-                # Check if PII was detected (for logging)
-                if self.pii_remover.contains_pii(review_text):
-                    logger.info(f"PII detected and removed from review dated {review_date}")
-                
-                # Create processed review
-                processed_review = {
-                    'platform': review.get('platform'),
-                    'rating': review.get('rating'),
-                    'title': cleaned_title,
-                    'review_text': review_text,  # Keep original for reference
-                    'cleaned_text': cleaned_text,  # Store cleaned version
-                    'review_date': review_date,
-                    'app_version': review.get('app_version'),
-                    'raw_data': review.get('raw_data', {})
-                }
-                
-                processed_reviews.append(processed_review)
-                
-            except Exception as e:
-                logger.error(f"Error processing review: {e}")
+        processed_count = 0
+        
+        # Filter by date range in one pass before the per-review text work
+        in_range_reviews = self.filter_by_date_range(reviews, start_date, end_date)
+        logger.debug(f"{len(in_range_reviews)} of {len(reviews)} reviews fall in the date range")
+        
+        # The filters below work on parallel columns (records + texts) and narrow
+        # both with one boolean mask per stage, so no per-stage tuples are built
+        candidates = in_range_reviews
+        texts = [review.review_text or '' for review in candidates]
+        
+        # Filter: Check word count (must have more than min_words)
+        min_words = self.min_words
+        mask = [count > min_words for count in self.language_detector.count_words_batch(texts)]
+        candidates = list(compress(candidates, mask))
+        kept_texts = list(compress(texts, mask))
+        logger.debug(f"Skipped {len(texts) - len(kept_texts)} reviews with {min_words} words or fewer")
+        texts = kept_texts
+        
+        # Filter: Check if English (if english_only is enabled)
+        if self.english_only:
+            mask = self.language_detector.is_english_batch(texts)
+            candidates = list(compress(candidates, mask))
+            kept_texts = list(compress(texts, mask))
+            logger.debug(f"Skipped {len(texts) - len(kept_texts)} non-English reviews")
+            texts = kept_texts
+        
+        # Clean text
+        cleaned_results = self.pii_remover.clean_and_detect_batch(texts)
+        
+        # Bind hot-loop lookups to locals once
+        clean_text = self.pii_remover.clean_text
+        
+        for review, review_text, (cleaned_text, had_pii) in zip(candidates, texts, cleaned_results):
+            # Skip if text is empty after cleaning
+            if not cleaned_text.strip():
+                logger.warning("Review text is empty after cleaning, skipping")
                 continue
+            
+            review_date = review.review_date
+            title = review.title
+            cleaned_title = clean_text(title) if isinstance(title, str) and title else None
+            
+            # Check if PII was detected (for logging)
+            if had_pii:
+                logger.info(f"PII detected and removed from review dated {review_date}")
+            
+            # Create processed review
+            processed_count += 1
+            yield {
+                'platform': review.platform,
+                'rating': review.rating,
+                'title': cleaned_title,
+                'review_text': review_text,  # Keep original for reference
+                'cleaned_text': cleaned_text,  # Store cleaned version
+                'review_date': review_date,
+                'app_version': review.app_version,
+                'raw_data': review.raw_data
+            }
         
-        logger.info(f"Processed {len(processed_reviews)} reviews (filtered from {len(reviews)})")
-        return processed_reviews
+        logger.info(f"Processed {processed_count} reviews (filtered from {len(reviews)})")
     
     def filter_by_date_range(
         self,
-        reviews: List[Dict],
+        reviews: List[FetchedReview],
         start_date: datetime,
         end_date: datetime
-    ) -> List[Dict]:
+    ) -> List[FetchedReview]:
         """
         Filter reviews by exact date range.
         
         Args:
-            reviews: List of review dictionaries
+            reviews: List of FetchedReview records
             start_date: Start date (inclusive)
             end_date: End date (inclusive)
         
@@ -132,8 +150,7 @@ class ReviewProcessor:
         """
         filtered = [
             review for review in reviews
-            if isinstance(review.get('review_date'), datetime)
-            and start_date <= review['review_date'] <= end_date
+            if start_date <= review.review_date <= end_date
         ]
         return filtered
 
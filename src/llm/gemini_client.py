@@ -2,19 +2,51 @@
 # Try to use official package first, fallback to HTTP client
 try:
     import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
     HAS_GEMINI_PACKAGE = True
+    # Errors worth retrying: quota, overload and server-side failures
+    TRANSIENT_ERRORS = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+    )
 except ImportError:
     HAS_GEMINI_PACKAGE = False
     genai = None
+    TRANSIENT_ERRORS = ()
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 import json
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import get_settings
+from src.llm.prompts import (
+    build_theme_extraction_prompt,
+    build_classification_prompt,
+    is_valid_classification,
+    parse_classifications,
+)
+from src.llm.response_cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing handlers still apply
+_json_loads = orjson.loads if HAS_ORJSON else json.loads
+
+# Attempts for transient errors; waits double from the base delay (5s, 10s)
+GEMINI_MAX_RETRIES = 3
+GEMINI_RETRY_BASE_DELAY = 5
+
 # Import HTTP fallback
 try:
     from src.llm.gemini_client_http import GeminiClientHTTP
@@ -23,6 +55,60 @@ except ImportError:
     HAS_HTTP_CLIENT = False
 
 
+def iter_json_array_items(chunks: Iterable[str], key: str) -> Iterator[Any]:
+    """
+    Incrementally yield items of the JSON array stored under ``key``.
+    
+    Items are decoded as soon as their closing bracket arrives, so callers can
+    start processing before the full response has been received. A stream
+    that ends before the array is closed (truncated or undecodable items)
+    raises json.JSONDecodeError, like parsing the whole document would.
+    
+    Args:
+        chunks: Iterable of text fragments forming one JSON document
+        key: Name of the array property to stream
+    
+    Yields:
+        Decoded array items
+    """
+    decoder = json.JSONDecoder()
+    key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ""
+    pos = None  # Index of the next unread character inside the array
+    
+    for chunk in chunks:
+        buffer += chunk
+        if pos is None:
+            match = key_pattern.search(buffer)
+            if not match:
+                continue
+            pos = match.end()
+        
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Item is incomplete, wait for more data
+            yield item
+    
+    if pos is None:
+        # Array key never appeared; fall back to parsing the whole document
+        result = _json_loads(buffer)
+        yield from result.get(key, [])
+        return
+    
+    if pos < len(buffer):
+        # Re-raise the decoder's own error for the item left in the buffer
+        decoder.raw_decode(buffer, pos)
+    raise json.JSONDecodeError("Unterminated array", buffer, pos)
+
+
 class GeminiClient:
     """Client for interacting with Google Gemini API."""
     
@@ -65,6 +151,113 @@ class GeminiClient:
                 "Please install one of: pip install google-generativeai OR pip install requests"
             )
     
+    def __enter__(self) -> "GeminiClient":
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def close(self):
+        """Release the HTTP backend's pooled connections and worker threads."""
+        if self.use_http:
+            self.http_client.close()
+    
+    def _generate_content(self, prompt: str, response_format: str = "json") -> str:
+        """
+        Request a response through the official package, retrying transient errors.
+        
+        Mirrors the HTTP client's backoff (5s, 10s) and shares its response
+        cache, so both backends survive short quota bursts and skip repeated
+        prompts the same way.
+        """
+        response_cache = get_response_cache()
+        cache_key = ResponseCache.prompt_key(self.model_name, response_format, prompt)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached Gemini response")
+            return cached["text"]
+        
+        generation_config = {}
+        if response_format == "json":
+            generation_config["response_mime_type"] = "application/json"
+        
+        for attempt in range(GEMINI_MAX_RETRIES):
+            try:
+                text = self.model.generate_content(prompt, generation_config=generation_config).text
+                response_cache.set(cache_key, {"text": text})
+                return text
+            except TRANSIENT_ERRORS as e:
+                if attempt == GEMINI_MAX_RETRIES - 1:
+                    raise
+                self._wait_before_retry(e, attempt)
+    
+    def _stream_content(self, prompt: str, response_format: str = "json") -> Iterator[str]:
+        """
+        Stream response text chunks with _generate_content's retries and cache.
+        
+        A transient error is retried only while no chunk has been yielded; once
+        the caller has seen partial output a retry would repeat it, so the
+        error is raised. Completed streams are cached (JSON ones only if they
+        parse), and a cache hit is yielded as a single chunk.
+        """
+        response_cache = get_response_cache()
+        cache_key = ResponseCache.prompt_key(self.model_name, response_format, prompt)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached Gemini response")
+            yield cached["text"]
+            return
+        
+        generation_config = {}
+        if response_format == "json":
+            generation_config["response_mime_type"] = "application/json"
+        
+        for attempt in range(GEMINI_MAX_RETRIES):
+            chunks = []
+            try:
+                response = self.model.generate_content(
+                    prompt, generation_config=generation_config, stream=True
+                )
+                for chunk in response:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+                break
+            except TRANSIENT_ERRORS as e:
+                if chunks or attempt == GEMINI_MAX_RETRIES - 1:
+                    raise
+                self._wait_before_retry(e, attempt)
+        
+        text = "".join(chunks)
+        if response_format == "json":
+            # A truncated or malformed response must not be replayed from the cache
+            _json_loads(text)
+        response_cache.set(cache_key, {"text": text})
+    
+    @staticmethod
+    def _wait_before_retry(error: Exception, attempt: int):
+        """Sleep for the backoff of a failed attempt (0-based)."""
+        wait_time = GEMINI_RETRY_BASE_DELAY * (2 ** attempt)
+        logger.warning(f"Gemini call failed ({error}). Waiting {wait_time}s before retry {attempt + 1}/{GEMINI_MAX_RETRIES}")
+        time.sleep(wait_time)
+    
+    def generate(self, prompt: str, response_format: str = "json") -> str:
+        """
+        Send a free-form prompt and return the raw response text.
+        
+        Used by callers with their own prompts (report and email generation) so
+        they get the same backend selection, retries and caching as the built-in tasks.
+        
+        Args:
+            prompt: Prompt text
+            response_format: Expected response format ("json" or "text")
+        
+        Returns:
+            Response text
+        """
+        if self.use_http:
+            return self.http_client._make_request(prompt, response_format=response_format)["text"]
+        return self._generate_content(prompt, response_format=response_format)
+    
     def extract_themes(self, reviews: List[Dict[str, Any]], max_themes: int = 5) -> Dict[str, Any]:
         """
         Extract top themes from reviews using LLM.
@@ -76,58 +269,17 @@ class GeminiClient:
         Returns:
             Dictionary with themes and their descriptions
         """
-        # Prepare review samples for analysis
-        review_samples = []
-        for i, review in enumerate(reviews[:100]):  # Use first 100 reviews for theme extraction
-            text = review.get('cleaned_text') or review.get('review_text', '')
-            rating = review.get('rating', 'N/A')
-            review_samples.append(f"Review {i+1} (Rating: {rating}/5): {text[:200]}")
-        
-        reviews_text = "\n\n".join(review_samples)
-        
-        prompt = f"""You are analyzing app reviews for a fintech investment app. Analyze the following reviews and identify the top {max_themes} themes that users are discussing.
-
-Reviews:
-{reviews_text}
-
-Instructions:
-1. Identify exactly {max_themes} themes based on what users are actually talking about
-2. Themes should be specific to the app's features and user concerns (e.g., "Order Execution Issues", "Login Problems", "Portfolio Tracking", etc.)
-3. Do NOT use generic themes like "App Experience" or "Easy to Use" unless they are truly the main themes
-4. For each theme, provide:
-   - Theme name (2-4 words, specific and actionable)
-   - Brief description (1-2 sentences explaining what this theme covers)
-   - Example keywords or phrases users mention
-
-Return ONLY valid JSON in this exact format:
-{{
-  "themes": [
-    {{
-      "name": "Theme Name",
-      "description": "Brief description of what this theme covers",
-      "keywords": ["keyword1", "keyword2"]
-    }},
-    ...
-  ]
-}}
-
-Do not include any markdown formatting, only JSON."""
-
         try:
             if self.use_http:
                 # Use HTTP client
                 return self.http_client.extract_themes(reviews, max_themes)
             
             # Use official package
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    "response_mime_type": "application/json",
-                }
-            )
+            prompt = build_theme_extraction_prompt(reviews, max_themes)
+            response_text = self._generate_content(prompt)
             
             # Parse JSON response
-            result = json.loads(response.text)
+            result = _json_loads(response_text)
             
             # Validate and clean themes
             themes = result.get("themes", [])
@@ -139,8 +291,8 @@ Do not include any markdown formatting, only JSON."""
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON response: {e}")
-            if not self.use_http and hasattr(self, 'response'):
-                logger.error(f"Response: {response.text[:500]}")
+            if not self.use_http:
+                logger.error(f"Response: {response_text[:500]}")
             raise
         except Exception as e:
             logger.error(f"Error extracting themes: {e}")
@@ -164,76 +316,112 @@ Do not include any markdown formatting, only JSON."""
         if not reviews or not themes:
             return []
         
-        # Prepare themes list for prompt
-        themes_list = []
-        for i, theme in enumerate(themes, 1):
-            themes_list.append(f"{i}. {theme['name']} - {theme.get('description', '')}")
+        if self.use_http:
+            # The HTTP client splits and fans out chunks itself
+            return self.http_client.classify_reviews(reviews, themes)
         
-        themes_text = "\n".join(themes_list)
+        chunk_size = settings.gemini_classify_chunk_size
+        if len(reviews) <= chunk_size:
+            return self._classify_chunk(reviews, themes)
         
-        # Prepare reviews batch
-        reviews_batch = []
-        for review in reviews:
-            review_id = str(review.get('id', ''))
-            text = review.get('cleaned_text') or review.get('review_text', '')
-            rating = review.get('rating', 'N/A')
-            reviews_batch.append(f"Review ID: {review_id}\nRating: {rating}/5\nText: {text}")
+        # Smaller prompts return sooner and a failure only loses one chunk;
+        # run chunks concurrently since the calls are network-bound
+        chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+        classifications = []
+        failed_chunks = 0
         
-        reviews_text = "\n\n---\n\n".join(reviews_batch)
+        with ThreadPoolExecutor(max_workers=min(settings.gemini_max_concurrency, len(chunks))) as executor:
+            futures = [executor.submit(self._classify_chunk, chunk, themes) for chunk in chunks]
+            for future in futures:
+                try:
+                    classifications.extend(future.result())
+                except Exception as e:
+                    logger.error(f"Error classifying review chunk: {e}")
+                    failed_chunks += 1
         
-        prompt = f"""You are tagging user reviews into exactly one of the following themes.
-
-Allowed themes:
-{themes_text}
-
-For each review below, assign it to exactly ONE theme that best matches the main concern or topic discussed.
-
-Reviews:
-{reviews_text}
-
-Return ONLY valid JSON in this exact format:
-{{
-  "classifications": [
-    {{
-      "review_id": "review_id_here",
-      "theme_name": "Exact theme name from the list above",
-      "reason": "One sentence explaining why this theme was chosen (no PII)"
-    }},
-    ...
-  ]
-}}
-
-Important:
-- Each review must be assigned to exactly ONE theme
-- Theme name must match exactly one from the allowed themes list
-- If a review doesn't clearly fit any theme, choose the closest match
-- Do not include any markdown formatting, only JSON."""
-
+        if failed_chunks == len(chunks):
+            raise RuntimeError(f"All {failed_chunks} classification chunks failed")
+        
+        logger.info(f"Classified {len(classifications)} reviews into themes in {len(chunks)} chunks")
+        return classifications
+    
+    def _classify_chunk(
+        self,
+        reviews: List[Dict[str, Any]],
+        themes: List[Dict[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """Classify one chunk of reviews with a single LLM request (official package)."""
         try:
-            if self.use_http:
-                # Use HTTP client
-                return self.http_client.classify_reviews(reviews, themes)
+            prompt = self._build_classification_prompt(reviews, themes)
+            response_text = self._generate_content(prompt)
             
-            # Use official package
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    "response_mime_type": "application/json",
-                }
-            )
-            
-            # Parse JSON response
-            result = json.loads(response.text)
-            classifications = result.get("classifications", [])
+            # Parse and validate JSON response
+            classifications = parse_classifications(_json_loads(response_text))
             
             logger.info(f"Classified {len(classifications)} reviews into themes")
             return classifications
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse classification JSON: {e}")
-            logger.error(f"Response: {response.text[:500]}")
+            logger.error(f"Response: {response_text[:500]}")
             raise
         except Exception as e:
             logger.error(f"Error classifying reviews: {e}")
             raise
-
+    
+    def stream_classify(
+        self,
+        reviews: List[Dict[str, Any]],
+        themes: List[Dict[str, str]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Classify reviews into themes, yielding each classification as it arrives.
+        
+        Args:
+            reviews: List of review dictionaries with 'id', 'review_text', 'cleaned_text'
+            themes: List of theme dictionaries with 'name' and 'description'
+        
+        Yields:
+            Classification dictionaries with review_id, theme_name, reason
+        """
+        if not reviews or not themes:
+            return
+        
+        if self.use_http:
+            # HTTP client has no streaming support; yield the full result
+            yield from self.http_client.classify_reviews(reviews, themes)
+            return
+        
+        prompt = self._build_classification_prompt(reviews, themes)
+        
+        try:
+            count = 0
+            stream = self._stream_content(prompt)
+            for classification in iter_json_array_items(stream, "classifications"):
+                if not is_valid_classification(classification):
+                    logger.warning(f"Skipping malformed classification: {classification!r:.200}")
+                    continue
+                count += 1
+                yield classification
+            
+            # The array ends before the document does; read the remaining
+            # chunks so the completed response reaches the cache
+            for _ in stream:
+                pass
+            
+            logger.info(f"Classified {count} reviews into themes")
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse classification JSON: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error classifying reviews: {e}")
+            raise
+    
+    def _build_classification_prompt(
+        self,
+        reviews: List[Dict[str, Any]],
+        themes: List[Dict[str, str]]
+    ) -> str:
+        """Build the classification prompt for a batch of reviews."""
+        return build_classification_prompt(reviews, themes)
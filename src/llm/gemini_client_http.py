@@ -1,24 +1,69 @@
 """Google Gemini LLM client using direct HTTP API calls (no package required)."""
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 from config.settings import get_settings
+from src.llm.prompts import (
+    build_theme_extraction_prompt,
+    build_classification_prompt,
+    parse_classifications,
+)
+from src.llm.response_cache import ResponseCache, get_response_cache
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     HAS_REQUESTS = True
 except ImportError:
     HAS_REQUESTS = False
     requests = None
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing handlers still apply
+_json_loads = orjson.loads if HAS_ORJSON else json.loads
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode a request body as UTF-8 JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+# Leading ```json / ``` and trailing ``` fences around a JSON response
+_FENCE_RE = re.compile(r"\A\s*```(?:json)?\s*|\s*```\s*\Z")
+
+
+def _strip_fences(text: str) -> str:
+    """Remove markdown code fences the model sometimes wraps JSON in."""
+    return _FENCE_RE.sub("", text).strip()
+
+
+# "Please retry in 12.3s." in 429 error messages
+_RETRY_IN_RE = re.compile(r"retry in ([\d.]+)s", re.IGNORECASE)
+
+# Shared by all client instances; tasks create a fresh client per run
+_response_cache = get_response_cache()
+
 
 class GeminiClientHTTP:
     """Gemini client using direct HTTP API calls."""
     
     GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+    JSON_HEADERS = {"Content-Type": "application/json"}
     
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         """
@@ -50,8 +95,52 @@ class GeminiClientHTTP:
             logger.info(f"Model {model} not available or rate-limited, using {model_name} instead")
         
         self.model_name = model_name
-        self.api_url = f"{self.GEMINI_API_BASE}/models/{model_name}:generateContent"
+        # Streamed as server-sent events so each chunk is parsed while the rest downloads
+        self.api_url = f"{self.GEMINI_API_BASE}/models/{model_name}:streamGenerateContent"
         logger.info(f"Using Gemini model: {model_name}")
+        
+        # Keep-alive session so repeated calls reuse the TCP/TLS connection;
+        # the pool is sized for the concurrent fan-out in _make_requests
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(settings.gemini_max_concurrency, 10),
+            max_retries=Retry(
+                total=3,
+                backoff_factor=2,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False  # Hand the last response back for logging
+            )
+        ))
+        # Reused across calls so each classify batch doesn't spin up fresh threads;
+        # created on first fan-out and again after close()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    def __enter__(self) -> "GeminiClientHTTP":
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the shared worker pool, starting it if needed."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.gemini_max_concurrency,
+                    thread_name_prefix="gemini"
+                )
+            return self._executor
+    
+    def close(self):
+        """Close pooled HTTP connections and worker threads."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self._session.close()
     
     def _make_request(self, prompt: str, response_format: str = "json") -> Dict[str, Any]:
         """
@@ -64,6 +153,12 @@ class GeminiClientHTTP:
         Returns:
             API response dictionary
         """
+        cache_key = ResponseCache.prompt_key(self.model_name, response_format, prompt)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached Gemini response")
+            return cached
+        
         payload = {
             "contents": [{
                 "parts": [{
@@ -81,70 +176,122 @@ class GeminiClientHTTP:
         if response_format == "json":
             payload["generationConfig"]["responseMimeType"] = "application/json"
         
-        params = {"key": self.api_key}
+        params = {"key": self.api_key, "alt": "sse"}
+        body = _json_dumps(payload)  # Encoded once, reused by retries
         
-        # Retry logic with exponential backoff for rate limits
+        # Connection errors and 5xx are retried by the session's urllib3 Retry;
+        # 429s are handled here because Gemini puts the wait hint in the body
         max_retries = 3
         base_delay = 5  # Start with 5 seconds
         
         for attempt in range(max_retries):
             try:
-                response = requests.post(
+                response = self._session.post(
                     self.api_url,
-                    json=payload,
+                    data=body,
+                    headers=self.JSON_HEADERS,
                     params=params,
-                    timeout=60
+                    timeout=60,
+                    stream=True
                 )
-                
-                # Handle rate limiting (429)
-                if response.status_code == 429:
-                    error_data = response.json().get("error", {})
-                    retry_after = error_data.get("message", "")
-                    
-                    # Extract retry time from message if available
-                    import re
-                    retry_match = re.search(r"retry in ([\d.]+)s", retry_after.lower())
-                    if retry_match:
-                        wait_time = float(retry_match.group(1)) + 2  # Add 2 seconds buffer
-                    else:
-                        wait_time = base_delay * (2 ** attempt)  # Exponential backoff
-                    
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Rate limit hit (429). Waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}")
-                        import time
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        response.raise_for_status()
-                
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                # Extract text from response
-                if "candidates" in result and len(result["candidates"]) > 0:
-                    candidate = result["candidates"][0]
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        text = candidate["content"]["parts"][0].get("text", "")
-                        return {"text": text, "raw": result}
-                
-                raise ValueError("Unexpected API response format")
-                
             except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1 and hasattr(e, 'response') and e.response is not None and e.response.status_code == 429:
-                    # Will retry in next iteration
-                    continue
                 logger.error(f"API request failed: {e}")
-                if hasattr(e, 'response') and e.response is not None:
-                    logger.error(f"Response: {e.response.text[:500]}")
-                if attempt == max_retries - 1:
-                    raise
+                raise
+            
+            # Handle rate limiting (429)
+            if response.status_code == 429 and attempt < max_retries - 1:
+                wait_time = self._rate_limit_delay(response, base_delay * (2 ** attempt))
+                # stream=True keeps the connection checked out until closed
+                response.close()
+                logger.warning(f"Rate limit hit (429). Waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}")
+                time.sleep(wait_time)
+                continue
+            
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"API request failed: {e}")
+                logger.error(f"Response: {response.text[:500]}")
+                raise
+            
+            with response:
+                text, result = self._read_stream(response)
+            
+            if result is None:
+                raise ValueError("Unexpected API response format")
+            
+            response_data = {"text": text, "raw": result}
+            _response_cache.set(cache_key, response_data)
+            return response_data
+    
+    def _rate_limit_delay(self, response, default_delay: float) -> float:
+        """Seconds to wait after a 429, from the "retry in Ns" hint if present."""
+        try:
+            message = response.json().get("error", {}).get("message", "")
+        except ValueError:
+            message = ""
+        
+        retry_match = _RETRY_IN_RE.search(message)
+        if retry_match:
+            return float(retry_match.group(1)) + 2  # Add 2 seconds buffer
+        return default_delay  # Exponential backoff
+    
+    def _read_stream(self, response) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Collect the candidate text from a server-sent-events response.
+        
+        Each "data:" line is a complete GenerateContentResponse holding the next
+        slice of text; the slices are joined into one string for the caller.
+        
+        Returns:
+            Tuple of (joined text, last event carrying candidate content or None)
+        """
+        text_parts = []
+        last_result = None
+        # SSE responses often omit the charset; the stream is always UTF-8
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            result = _json_loads(line[5:])
+            candidates = result.get("candidates")
+            if not candidates:
+                continue
+            for part in candidates[0].get("content", {}).get("parts", []):
+                text_parts.append(part.get("text", ""))
+            last_result = result
+        return "".join(text_parts), last_result
+    
+    def _make_requests(
+        self,
+        prompts: List[str],
+        response_format: str = "json"
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Send several prompts concurrently.
+        
+        Calls are network-bound and requests releases the GIL during socket I/O,
+        so the client's bounded thread pool overlaps them while each
+        keeps its own retry/backoff. Results come back in prompt order; a prompt
+        that fails yields its exception instead of aborting the others.
+        
+        Args:
+            prompts: Prompt texts
+            response_format: Expected response format ("json" or "text")
+        
+        Returns:
+            One response dictionary (or exception) per prompt
+        """
+        def request(prompt: str) -> Union[Dict[str, Any], Exception]:
+            try:
+                return self._make_request(prompt, response_format=response_format)
             except Exception as e:
-                logger.error(f"Error processing API response: {e}")
-                if attempt == max_retries - 1:
-                    raise
+                return e
         
-        raise Exception("Max retries exceeded")
+        if len(prompts) <= 1:
+            return [request(prompt) for prompt in prompts]
+        
+        return list(self._get_executor().map(request, prompts))
     
     def extract_themes(self, reviews: List[Dict[str, Any]], max_themes: int = 5) -> Dict[str, Any]:
         """
@@ -157,58 +304,14 @@ class GeminiClientHTTP:
         Returns:
             Dictionary with themes and their descriptions
         """
-        # Prepare review samples for analysis
-        review_samples = []
-        for i, review in enumerate(reviews[:100]):  # Use first 100 reviews for theme extraction
-            text = review.get('cleaned_text') or review.get('review_text', '')
-            rating = review.get('rating', 'N/A')
-            review_samples.append(f"Review {i+1} (Rating: {rating}/5): {text[:200]}")
-        
-        reviews_text = "\n\n".join(review_samples)
-        
-        prompt = f"""You are analyzing app reviews for a fintech investment app. Analyze the following reviews and identify the top {max_themes} themes that users are discussing.
-
-Reviews:
-{reviews_text}
-
-Instructions:
-1. Identify exactly {max_themes} themes based on what users are actually talking about
-2. Themes should be specific to the app's features and user concerns (e.g., "Order Execution Issues", "Login Problems", "Portfolio Tracking", etc.)
-3. Do NOT use generic themes like "App Experience" or "Easy to Use" unless they are truly the main themes
-4. For each theme, provide:
-   - Theme name (2-4 words, specific and actionable)
-   - Brief description (1-2 sentences explaining what this theme covers)
-   - Example keywords or phrases users mention
-
-Return ONLY valid JSON in this exact format:
-{{
-  "themes": [
-    {{
-      "name": "Theme Name",
-      "description": "Brief description of what this theme covers",
-      "keywords": ["keyword1", "keyword2"]
-    }},
-    ...
-  ]
-}}
-
-Do not include any markdown formatting, only JSON."""
+        prompt = build_theme_extraction_prompt(reviews, max_themes)
 
         try:
             response = self._make_request(prompt, response_format="json")
-            text = response["text"].strip()
-            
-            # Remove markdown code blocks if present
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
+            text = _strip_fences(response["text"])
             
             # Parse JSON response
-            result = json.loads(text)
+            result = _json_loads(text)
             
             # Validate and clean themes
             themes = result.get("themes", [])
@@ -244,76 +347,41 @@ Do not include any markdown formatting, only JSON."""
         if not reviews or not themes:
             return []
         
-        # Prepare themes list for prompt
-        themes_list = []
-        for i, theme in enumerate(themes, 1):
-            themes_list.append(f"{i}. {theme['name']} - {theme.get('description', '')}")
+        # One request per chunk, dispatched together so wall-clock is ~one round trip
+        chunk_size = settings.gemini_classify_chunk_size
+        chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+        responses = self._make_requests(
+            [build_classification_prompt(chunk, themes) for chunk in chunks],
+            response_format="json"
+        )
         
-        themes_text = "\n".join(themes_list)
+        classifications = []
+        errors = []
+        for response in responses:
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                classifications.extend(self._parse_classifications(response["text"]))
+            except Exception as e:
+                logger.error(f"Error classifying reviews: {e}")
+                errors.append(e)
         
-        # Prepare reviews batch
-        reviews_batch = []
-        for review in reviews:
-            review_id = str(review.get('id', ''))
-            text = review.get('cleaned_text') or review.get('review_text', '')
-            rating = review.get('rating', 'N/A')
-            reviews_batch.append(f"Review ID: {review_id}\nRating: {rating}/5\nText: {text}")
+        if len(errors) == len(chunks):
+            # Nothing usable came back; surface the failure as before
+            raise errors[0]
         
-        reviews_text = "\n\n---\n\n".join(reviews_batch)
+        logger.info(f"Classified {len(classifications)} reviews into themes")
+        return classifications
+    
+    def _parse_classifications(self, text: str) -> List[Dict[str, Any]]:
+        """Parse the classifications list out of one classification response."""
+        text = _strip_fences(text)
         
-        prompt = f"""You are tagging user reviews into exactly one of the following themes.
-
-Allowed themes:
-{themes_text}
-
-For each review below, assign it to exactly ONE theme that best matches the main concern or topic discussed.
-
-Reviews:
-{reviews_text}
-
-Return ONLY valid JSON in this exact format:
-{{
-  "classifications": [
-    {{
-      "review_id": "review_id_here",
-      "theme_name": "Exact theme name from the list above",
-      "reason": "One sentence explaining why this theme was chosen (no PII)"
-    }},
-    ...
-  ]
-}}
-
-Important:
-- Each review must be assigned to exactly ONE theme
-- Theme name must match exactly one from the allowed themes list
-- If a review doesn't clearly fit any theme, choose the closest match
-- Do not include any markdown formatting, only JSON."""
-
         try:
-            response = self._make_request(prompt, response_format="json")
-            text = response["text"].strip()
-            
-            # Remove markdown code blocks if present
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-            
-            # Parse JSON response
-            result = json.loads(text)
-            classifications = result.get("classifications", [])
-            
-            logger.info(f"Classified {len(classifications)} reviews into themes")
-            return classifications
-            
+            result = _json_loads(text)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse classification JSON: {e}")
             logger.error(f"Response text: {text[:500]}")
             raise
-        except Exception as e:
-            logger.error(f"Error classifying reviews: {e}")
-            raise
+        return parse_classifications(result)
 
@@ -0,0 +1,131 @@
+"""Prompt templates, and the response shapes they ask for, shared by the Gemini clients."""
+import logging
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fill with str.format(reviews=..., max_themes=...)
+THEME_EXTRACTION_PROMPT = """You are analyzing app reviews for a fintech investment app. Analyze the following reviews and identify the top {max_themes} themes that users are discussing.
+
+Reviews:
+{reviews}
+
+Instructions:
+1. Identify exactly {max_themes} themes based on what users are actually talking about
+2. Themes should be specific to the app's features and user concerns (e.g., "Order Execution Issues", "Login Problems", "Portfolio Tracking", etc.)
+3. Do NOT use generic themes like "App Experience" or "Easy to Use" unless they are truly the main themes
+4. For each theme, provide:
+   - Theme name (2-4 words, specific and actionable)
+   - Brief description (1-2 sentences explaining what this theme covers)
+   - Example keywords or phrases users mention
+
+Return ONLY valid JSON in this exact format:
+{{
+  "themes": [
+    {{
+      "name": "Theme Name",
+      "description": "Brief description of what this theme covers",
+      "keywords": ["keyword1", "keyword2"]
+    }},
+    ...
+  ]
+}}
+
+Do not include any markdown formatting, only JSON."""
+
+# Fill with str.format(themes=..., reviews=...)
+CLASSIFICATION_PROMPT = """You are tagging user reviews into exactly one of the following themes.
+
+Allowed themes:
+{themes}
+
+For each review below, assign it to exactly ONE theme that best matches the main concern or topic discussed.
+
+Reviews:
+{reviews}
+
+Return ONLY valid JSON in this exact format:
+{{
+  "classifications": [
+    {{
+      "review_id": "review_id_here",
+      "theme_name": "Exact theme name from the list above",
+      "reason": "One sentence explaining why this theme was chosen (no PII)"
+    }},
+    ...
+  ]
+}}
+
+Important:
+- Each review must be assigned to exactly ONE theme
+- Theme name must match exactly one from the allowed themes list
+- If a review doesn't clearly fit any theme, choose the closest match
+- Do not include any markdown formatting, only JSON."""
+
+
+def build_theme_extraction_prompt(reviews: List[Dict[str, Any]], max_themes: int) -> str:
+    """Build the theme extraction prompt from the first 100 reviews."""
+    reviews_text = "\n\n".join(
+        f"Review {i} (Rating: {review.get('rating', 'N/A')}/5): "
+        f"{(review.get('cleaned_text') or review.get('review_text', ''))[:200]}"
+        for i, review in enumerate(reviews[:100], 1)  # Use first 100 reviews for theme extraction
+    )
+    return THEME_EXTRACTION_PROMPT.format(reviews=reviews_text, max_themes=max_themes)
+
+
+@lru_cache(maxsize=32)
+def _classification_prompt_parts(themes: Tuple[Tuple[str, str], ...]) -> Tuple[str, str]:
+    """
+    Render the classification template around its {reviews} slot for one theme set.
+    
+    Every batch in a run shares the theme list, so the instructions and themes
+    are formatted once and each batch only joins its own reviews in between.
+    """
+    themes_text = "\n".join(
+        f"{i}. {name} - {description}"
+        for i, (name, description) in enumerate(themes, 1)
+    )
+    prefix, suffix = CLASSIFICATION_PROMPT.split("{reviews}")
+    return prefix.format(themes=themes_text), suffix.format()
+
+
+def build_classification_prompt(reviews: List[Dict[str, Any]], themes: List[Dict[str, str]]) -> str:
+    """Build the classification prompt for a batch of reviews."""
+    prefix, suffix = _classification_prompt_parts(
+        tuple((theme['name'], theme.get('description', '')) for theme in themes)
+    )
+    reviews_text = "\n\n---\n\n".join(
+        f"Review ID: {review.get('id', '')}\n"
+        f"Rating: {review.get('rating', 'N/A')}/5\n"
+        f"Text: {review.get('cleaned_text') or review.get('review_text', '')}"
+        for review in reviews
+    )
+    return prefix + reviews_text + suffix
+
+
+def is_valid_classification(item: Any) -> bool:
+    """Check one item has the review_id/theme_name shape CLASSIFICATION_PROMPT asks for."""
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("review_id"), str)
+        and isinstance(item.get("theme_name"), str)
+    )
+
+
+def parse_classifications(result: Any) -> List[Dict[str, Any]]:
+    """
+    Validate a decoded classification response in one pass.
+    
+    Raises ValueError if the response has no classifications list at all;
+    individual malformed entries are dropped (and counted in the log) so one
+    bad item does not fail the whole batch downstream.
+    """
+    classifications = result.get("classifications") if isinstance(result, dict) else None
+    if not isinstance(classifications, list):
+        raise ValueError("Classification response has no 'classifications' list")
+    
+    valid = [item for item in classifications if is_valid_classification(item)]
+    if len(valid) < len(classifications):
+        logger.warning(f"Dropped {len(classifications) - len(valid)} malformed classifications")
+    return valid
@@ -0,0 +1,148 @@
+"""Cache of LLM responses keyed by exact prompt, in memory and optionally on disk."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+from config.settings import get_settings
+
+# Prompts are split here into a fixed instruction prefix and a variable tail
+PROMPT_SPLIT_MARKER = "Reviews:\n"
+
+CacheKey = Tuple[str, str]
+
+
+@lru_cache(maxsize=64)
+def _prefix_digest(*parts: str) -> str:
+    """Digest a prompt prefix; the few distinct prefixes are hashed once each."""
+    return ResponseCache.make_key(*parts)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a time-to-live.
+    
+    Keys are (prefix digest, tail digest) pairs, so long prompts are not kept
+    in memory twice and every response for one instruction prefix (template,
+    theme list, model) shares a bucket. Only exact repeats hit: a
+    near-identical prompt (e.g. one changed review) can legitimately need a
+    different answer.
+    
+    With a path, entries are also written to a SQLite file so repeated runs
+    in new processes can reuse them until the TTL expires.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400, path: str = ""):
+        """
+        Initialize response cache.
+        
+        Args:
+            max_entries: Entries kept in memory before the least recently used is evicted
+            ttl_seconds: Seconds an entry stays valid (0 disables the cache)
+            path: Optional SQLite file for a persistent second tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path and ttl_seconds > 0:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "prefix_hash TEXT NOT NULL, "
+                    "tail_hash TEXT NOT NULL, "
+                    "response TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, "
+                    "PRIMARY KEY (prefix_hash, tail_hash))"
+                )
+    
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Digest the parts that determine a response (model, format, prompt...)."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    @staticmethod
+    def prompt_key(model: str, response_format: str, prompt: str) -> CacheKey:
+        """Key a prompt by its instruction prefix and its variable (reviews) tail."""
+        prefix, marker, tail = prompt.partition(PROMPT_SPLIT_MARKER)
+        return _prefix_digest(model, response_format, prefix + marker), ResponseCache.make_key(tail)
+    
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+            
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT response, created_at FROM llm_cache WHERE prefix_hash = ? AND tail_hash = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            age = time.time() - row[1]
+            if age > self.ttl_seconds:
+                with self._db:
+                    self._db.execute(
+                        "DELETE FROM llm_cache WHERE prefix_hash = ? AND tail_hash = ?", key
+                    )
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value, self.ttl_seconds - age)
+            return value
+    
+    def set(self, key: CacheKey, value: Any):
+        """Store a value, evicting the least recently used entry when full."""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._remember(key, value, self.ttl_seconds)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                        (key[0], key[1], json.dumps(value), time.time())
+                    )
+    
+    def _remember(self, key: CacheKey, value: Any, ttl: float):
+        """Add an entry to the in-memory tier (caller holds the lock)."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM llm_cache")
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache shared by both Gemini backends."""
+    settings = get_settings()
+    return ResponseCache(
+        max_entries=settings.llm_cache_max_entries,
+        ttl_seconds=settings.llm_cache_ttl_seconds,
+        path=settings.llm_cache_path
+    )
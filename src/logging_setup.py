@@ -0,0 +1,35 @@
+"""Logging configuration shared by the CLI entry points."""
+import logging
+import logging.handlers
+import sys
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_configured = False
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = None):
+    """
+    Configure root logging once per process.
+
+    Repeated calls (e.g. when one entry point imports another) are no-ops,
+    so handlers are never stacked and records are never written twice.
+
+    Args:
+        level: Root logger level (default: INFO)
+        log_file: Optional path for a size-rotated log file
+    """
+    global _configured
+    if _configured or logging.getLogger().handlers:
+        _configured = True
+        return
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(log_file, maxBytes=5_000_000, backupCount=3)
+        )
+
+    logging.basicConfig(level=level, format=LOG_FORMAT, handlers=handlers)
+    _configured = True
@@ -1,14 +1,13 @@
 """Main orchestrator for the weekly review insights pipeline."""
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.database.models import Base
+from src.database.engine import ensure_schema, get_engine, get_sessionmaker
 from src.tasks.fetch_reviews import ReviewFetchTask
 from src.tasks.classify_themes import ThemeClassificationTask
 from src.tasks.generate_weekly_report import GenerateWeeklyReportTask
-from src.tasks.send_weekly_email import SendWeeklyEmailTask
+from src.reporting.weekly_report_generator import report_word_count
 from config.settings import get_settings
 import os
 
@@ -36,11 +35,11 @@ class WeeklyPipeline:
         # Force SQLite for local development/testing
         sqlite_db_path = os.path.join(os.getcwd(), 'reviews.db')
         self.database_url = database_url or f"sqlite:///{sqlite_db_path}"
-        logger.info(f"Using database: {self.database_url}")
+        logger.info("Using database: %s", self.database_url)
         
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        Base.metadata.create_all(self.engine)
+        self.engine = get_engine(self.database_url)
+        self.SessionLocal = get_sessionmaker(self.database_url)
+        ensure_schema(self.database_url)
         
         self.api_key = api_key or settings.google_api_key
         if not self.api_key:
@@ -56,8 +55,13 @@ class WeeklyPipeline:
         if self.api_key:
             os.environ['GOOGLE_API_KEY'] = self.api_key
         
-        self.report_task = GenerateWeeklyReportTask(api_key=self.api_key)
-        self.email_task = SendWeeklyEmailTask(api_key=self.api_key)
+        # All tasks get the same URL so get_engine hands every one the same engine/pool
+        self.report_task = GenerateWeeklyReportTask(database_url=self.database_url, api_key=self.api_key)
+        self.email_task = None
+        if not skip_email:
+            # Only runs that send email load the drafting/sending modules
+            from src.tasks.send_weekly_email import SendWeeklyEmailTask
+            self.email_task = SendWeeklyEmailTask(database_url=self.database_url, api_key=self.api_key)
     
     def execute(
         self,
@@ -76,6 +80,7 @@ class WeeklyPipeline:
         Returns:
             Dictionary with execution results and statistics
         """
+        started = time.monotonic()
         results = {
             "started_at": datetime.utcnow().isoformat(),
             "steps": {},
@@ -98,7 +103,7 @@ class WeeklyPipeline:
         logger.info("=" * 70)
         logger.info("WEEKLY REVIEW INSIGHTS PIPELINE")
         logger.info("=" * 70)
-        logger.info(f"Week: {week_start.date()} to {week_end.date()}")
+        logger.info("Week: %s to %s", week_start.date(), week_end.date())
         logger.info("=" * 70)
         
         try:
@@ -114,9 +119,9 @@ class WeeklyPipeline:
                     "success": True,
                     "stats": fetch_stats
                 }
-                logger.info(f"✓ Fetched {fetch_stats.get('total_created', 0)} new reviews")
+                logger.info("✓ Fetched %s new reviews", fetch_stats.get('total_created', 0))
             except Exception as e:
-                logger.error(f"✗ Step 1 failed: {e}")
+                logger.error("✗ Step 1 failed: %s", e)
                 results["steps"]["fetch_reviews"] = {
                     "success": False,
                     "error": str(e)
@@ -132,16 +137,20 @@ class WeeklyPipeline:
                     "success": True,
                     "stats": classify_stats
                 }
-                logger.info(f"✓ Classified {classify_stats.get('reviews_classified', 0)} reviews into {classify_stats.get('themes_discovered', 0)} themes")
+                logger.info(
+                    "✓ Classified %s reviews into %s themes",
+                    classify_stats.get('reviews_classified', 0),
+                    classify_stats.get('themes_extracted', 0)
+                )
             except Exception as e:
-                logger.error(f"✗ Step 2 failed: {e}")
+                logger.error("✗ Step 2 failed: %s", e)
                 results["steps"]["classify_themes"] = {
                     "success": False,
                     "error": str(e)
                 }
                 results["errors"].append(f"Classify themes: {e}")
                 # Stop pipeline if classification fails
-                results["completed_at"] = datetime.utcnow().isoformat()
+                self._mark_completed(results, started)
                 return results
             
             # Step 3: Generate Weekly Report
@@ -156,24 +165,18 @@ class WeeklyPipeline:
                 results["steps"]["generate_report"] = {
                     "success": True,
                     "report_id": report_id,
-                    "word_count": len(" ".join([
-                        report.get("title", ""),
-                        report.get("overview", ""),
-                        " ".join([t.get("summary", "") for t in report.get("themes", [])]),
-                        " ".join([q.get("text", "") for q in report.get("quotes", [])]),
-                        " ".join([a.get("text", "") for a in report.get("actions", [])])
-                    ]).split())
+                    "word_count": report_word_count(report)
                 }
-                logger.info(f"✓ Generated weekly report (ID: {report_id})")
+                logger.info("✓ Generated weekly report (ID: %s)", report_id)
             except Exception as e:
-                logger.error(f"✗ Step 3 failed: {e}")
+                logger.error("✗ Step 3 failed: %s", e)
                 results["steps"]["generate_report"] = {
                     "success": False,
                     "error": str(e)
                 }
                 results["errors"].append(f"Generate report: {e}")
                 # Stop pipeline if report generation fails
-                results["completed_at"] = datetime.utcnow().isoformat()
+                self._mark_completed(results, started)
                 return results
             
             # Step 4: Send Email
@@ -192,11 +195,11 @@ class WeeklyPipeline:
                         "recipients": send_status.get("recipients", [])
                     }
                     if send_status.get("success"):
-                        logger.info(f"✓ Email sent successfully to {len(send_status.get('recipients', []))} recipients")
+                        logger.info("✓ Email sent successfully to %d recipients", len(send_status.get('recipients', [])))
                     else:
-                        logger.warning(f"⚠ Email sending failed: {send_status.get('error')}")
+                        logger.warning("⚠ Email sending failed: %s", send_status.get('error'))
                 except Exception as e:
-                    logger.error(f"✗ Step 4 failed: {e}")
+                    logger.error("✗ Step 4 failed: %s", e)
                     results["steps"]["send_email"] = {
                         "success": False,
                         "error": str(e)
@@ -212,7 +215,7 @@ class WeeklyPipeline:
             
             # Pipeline completed successfully
             results["success"] = True
-            results["completed_at"] = datetime.utcnow().isoformat()
+            self._mark_completed(results, started)
             
             logger.info("\n" + "=" * 70)
             logger.info("PIPELINE COMPLETED SUCCESSFULLY")
@@ -222,28 +225,34 @@ class WeeklyPipeline:
             self._print_summary(results)
             
         except Exception as e:
-            logger.error(f"\n✗ Pipeline failed with error: {e}")
+            logger.error("\n✗ Pipeline failed with error: %s", e)
             results["success"] = False
             results["errors"].append(f"Pipeline execution: {e}")
-            results["completed_at"] = datetime.utcnow().isoformat()
+            self._mark_completed(results, started)
             import traceback
             logger.error(traceback.format_exc())
         
         return results
     
+    def _mark_completed(self, results: Dict[str, Any], started: float):
+        """Stamp completion time and monotonic run duration on the results."""
+        results["completed_at"] = datetime.utcnow().isoformat()
+        results["duration_seconds"] = round(time.monotonic() - started, 1)
+    
     def _print_summary(self, results: Dict[str, Any]):
         """Print execution summary."""
         logger.info("\nExecution Summary:")
-        logger.info(f"  Week: {results.get('week_start', 'N/A')} to {results.get('week_end', 'N/A')}")
+        logger.info("  Week: %s to %s", results.get('week_start', 'N/A'), results.get('week_end', 'N/A'))
+        logger.info("  Duration: %ss", results.get('duration_seconds', 'N/A'))
         
         for step_name, step_result in results.get("steps", {}).items():
             status = "✓" if step_result.get("success") else "✗"
-            logger.info(f"  {status} {step_name.replace('_', ' ').title()}")
+            logger.info("  %s %s", status, step_name.replace('_', ' ').title())
             if not step_result.get("success") and "error" in step_result:
-                logger.info(f"    Error: {step_result['error']}")
+                logger.info("    Error: %s", step_result['error'])
         
         if results.get("errors"):
-            logger.warning(f"\n⚠ {len(results['errors'])} error(s) occurred during execution")
+            logger.warning("\n⚠ %d error(s) occurred during execution", len(results['errors']))
         else:
             logger.info("\n✓ All steps completed without errors")
 
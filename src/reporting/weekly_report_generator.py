@@ -2,15 +2,122 @@
 import json
 import logging
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import func, and_
 from src.database.models import Review, Theme, ReviewTheme, WeeklyReport
 from src.llm.gemini_client import GeminiClient
+from src.utils.rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Gemini free tier allows 15 requests/minute; stay a little under it
+LLM_REQUESTS_PER_MINUTE = 13
+LLM_MAX_CONCURRENCY = 4
+
+# Chunk packing for summarization: review texts are cut to REVIEW_CHAR_LIMIT and
+# packed until the estimated prompt tokens reach the budget (~4 chars per token)
+REVIEW_CHAR_LIMIT = 500
+CHARS_PER_TOKEN = 4
+REVIEW_TOKEN_OVERHEAD = 8  # "Review N:" label and separator
+CHUNK_TOKEN_BUDGET = 3000
+MAX_CHUNK_REVIEWS = 40
+
+# Chunk summaries combined per merge call when a theme has many chunks
+SUMMARY_MERGE_FAN_IN = 5
+
+# Word-set overlap above which two key points/quotes count as the same point
+NEAR_DUPLICATE_THRESHOLD = 0.6
+
+_WORD_RE = re.compile(r"\w+")
+
+# Report word limit, and the overshoot trimmed locally instead of by the LLM
+REPORT_MAX_WORDS = 250
+LOCAL_TRIM_MAX_WORDS = 300
+MIN_OVERVIEW_WORDS = 20
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Leading ```json / ``` and trailing ``` fences around a JSON response
+_FENCE_RE = re.compile(r"\A\s*```(?:json)?\s*|\s*```\s*\Z")
+
+
+def dedupe_near_duplicates(texts: List[str], limit: int) -> List[str]:
+    """
+    Drop texts that repeat an earlier one in different words.
+    
+    Two texts are the same point when the Jaccard overlap of their lowercase
+    word sets reaches NEAR_DUPLICATE_THRESHOLD; the longer wording is kept in
+    the first one's position. Returns at most ``limit`` texts.
+    """
+    kept: List[str] = []
+    kept_words: List[frozenset] = []
+    for text in texts:
+        words = frozenset(_WORD_RE.findall(text.lower()))
+        for i, other in enumerate(kept_words):
+            union = words | other
+            if not union or len(words & other) / len(union) >= NEAR_DUPLICATE_THRESHOLD:
+                if len(text) > len(kept[i]):
+                    kept[i] = text
+                break
+        else:
+            kept.append(text)
+            kept_words.append(words)
+    return kept[:limit]
+
+
+def _iter_report_text(report: Dict[str, Any]) -> Iterator[str]:
+    """Yield each user-visible text field of a report."""
+    yield report.get("title", "")
+    yield report.get("overview", "")
+    yield from (t.get("summary", "") for t in report.get("themes", []))
+    yield from (q.get("text", "") for q in report.get("quotes", []))
+    yield from (a.get("text", "") for a in report.get("actions", []))
+
+
+def report_word_count(report: Dict[str, Any]) -> int:
+    """Count report words field by field, without joining the text into one string."""
+    return sum(len(text.split()) for text in _iter_report_text(report))
+
+
+def _prompt_json(obj: Any) -> str:
+    """Serialize data for a prompt compactly; indentation only costs input tokens."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _review_key(text: str) -> str:
+    """Normalize review text so verbatim repeats compare equal."""
+    return " ".join(text.casefold().split())
+
+
+def trim_report(report: Dict[str, Any], max_words: int = REPORT_MAX_WORDS) -> Optional[Dict[str, Any]]:
+    """
+    Bring a slightly long report under max_words without an LLM call.
+    
+    Cuts each action to its first sentence, then drops words from the end of
+    the overview (keeping at least MIN_OVERVIEW_WORDS).
+    
+    Returns:
+        Trimmed copy of the report, or None if that is not enough
+    """
+    trimmed = dict(report)
+    trimmed["actions"] = [
+        dict(action, text=_SENTENCE_END_RE.split(action.get("text", ""), 1)[0])
+        for action in report.get("actions", [])
+    ]
+    
+    excess = report_word_count(trimmed) - max_words
+    if excess > 0:
+        overview_words = trimmed.get("overview", "").split()
+        keep = len(overview_words) - excess
+        if keep < MIN_OVERVIEW_WORDS:
+            return None
+        trimmed["overview"] = " ".join(overview_words[:keep]).rstrip(",;:") + "…"
+    return trimmed
+
 
 class WeeklyReportGenerator:
     """Generates weekly one-page reports from classified reviews."""
@@ -18,33 +125,22 @@ class WeeklyReportGenerator:
     def __init__(self, session: Session, gemini_client: GeminiClient):
         self.session = session
         self.gemini_client = gemini_client
-        self.chunk_size = 20  # Reviews per chunk for summarization
+        self.chunk_token_budget = CHUNK_TOKEN_BUDGET  # Estimated review tokens per summarization prompt
+        self.max_chunk_reviews = MAX_CHUNK_REVIEWS
+        # Shared by concurrent chunk calls; a burst of one fan-out wave, then the quota rate
+        self.rate_limiter = TokenBucket(rate=LLM_REQUESTS_PER_MINUTE / 60, capacity=LLM_MAX_CONCURRENCY)
+        # Themes and their chunks fan out together; cap calls in flight across both
+        self._llm_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
     
     def _call_gemini(self, prompt: str) -> str:
         """Helper method to call Gemini API with proper error handling."""
-        # Use HTTP client if available, otherwise use official package
-        if hasattr(self.gemini_client, 'use_http') and self.gemini_client.use_http:
-            response_text = self.gemini_client.http_client._make_request(
-                prompt,
-                response_format="json"
-            )["text"]
-        else:
-            response = self.gemini_client.model.generate_content(
-                prompt,
-                generation_config={"response_mime_type": "application/json"}
-            )
-            response_text = response.text
+        self.rate_limiter.acquire()
+        
+        with self._llm_slots:
+            response_text = self.gemini_client.generate(prompt, response_format="json")
         
         # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        return response_text
+        return _FENCE_RE.sub("", response_text).strip()
     
     def get_reviews_for_week(
         self,
@@ -64,47 +160,45 @@ class WeeklyReportGenerator:
         Returns:
             Dictionary mapping theme names to lists of reviews
         """
-        # Get all reviews in date range with themes
-        reviews_query = (
-            self.session.query(Review, Theme)
-            .join(ReviewTheme, Review.id == ReviewTheme.review_id)
-            .join(Theme, ReviewTheme.theme_id == Theme.id)
-            .filter(
-                and_(
-                    Review.review_date >= week_start,
-                    Review.review_date <= week_end
-                )
-            )
+        in_week = and_(
+            Review.review_date >= week_start,
+            Review.review_date <= week_end
         )
         
-        reviews_with_themes = reviews_query.all()
-        
-        # Group by theme
-        theme_reviews: Dict[str, List[Review]] = {}
-        theme_counts: Dict[str, int] = {}
-        
-        for review, theme in reviews_with_themes:
-            theme_name = theme.name
-            if theme_name not in theme_reviews:
-                theme_reviews[theme_name] = []
-            theme_reviews[theme_name].append(review)
-            theme_counts[theme_name] = theme_counts.get(theme_name, 0) + 1
-        
-        # Sort themes by count and take top N
-        sorted_themes = sorted(
-            theme_counts.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_n_themes]
-        
-        # Return only top N themes
-        top_themes_dict = {
-            theme_name: theme_reviews[theme_name]
-            for theme_name, _ in sorted_themes
-        }
+        # Rank themes in the database so only the top N themes' reviews are loaded
+        review_count = func.count(ReviewTheme.review_id).label("review_count")
+        top_themes = (
+            self.session.query(Theme.id, Theme.name, review_count)
+            .join(ReviewTheme, ReviewTheme.theme_id == Theme.id)
+            .join(Review, Review.id == ReviewTheme.review_id)
+            .filter(in_week)
+            .group_by(Theme.id, Theme.name)
+            .order_by(review_count.desc())
+            .limit(top_n_themes)
+            .all()
+        )
+        
+        if not top_themes:
+            logger.info(f"Found 0 reviews for week {week_start.date()} to {week_end.date()}")
+            return {}
+        
+        # Dict order follows the ranking
+        theme_names = {theme_id: name for theme_id, name, _ in top_themes}
+        top_themes_dict: Dict[str, List[Review]] = {name: [] for name in theme_names.values()}
+        
+        # Summaries only read the text columns; skip raw_data and the rest
+        reviews_query = (
+            self.session.query(ReviewTheme.theme_id, Review)
+            .join(Review, Review.id == ReviewTheme.review_id)
+            .filter(ReviewTheme.theme_id.in_(theme_names), in_week)
+            .options(load_only(Review.id, Review.cleaned_text, Review.review_text, Review.review_date))
+        )
+        # Stream rows in batches instead of buffering the whole result first
+        for theme_id, review in reviews_query.yield_per(1000):
+            top_themes_dict[theme_names[theme_id]].append(review)
         
         logger.info(
-            f"Found {len(reviews_with_themes)} reviews for week "
+            f"Found {sum(count for _, _, count in top_themes)} reviews in the top themes for week "
             f"{week_start.date()} to {week_end.date()}"
         )
         logger.info(
@@ -117,7 +211,8 @@ class WeeklyReportGenerator:
     def summarize_theme_chunk(
         self,
         theme_name: str,
-        reviews: List[Review]
+        reviews: List[Review],
+        repeat_counts: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """
         Summarize a chunk of reviews for a theme.
@@ -126,6 +221,8 @@ class WeeklyReportGenerator:
         Args:
             theme_name: Name of the theme
             reviews: List of Review objects
+            repeat_counts: Optional occurrences per normalized text, for reviews
+                deduplicated by the caller
             
         Returns:
             Dictionary with key_points and candidate_quotes
@@ -138,14 +235,15 @@ class WeeklyReportGenerator:
         for review in reviews:
             text = review.cleaned_text or review.review_text
             if text and len(text.strip()) > 0:
-                review_texts.append(text[:500])  # Limit length
+                count = repeat_counts.get(_review_key(text), 1) if repeat_counts else 1
+                review_texts.append((text[:REVIEW_CHAR_LIMIT], count))  # Limit length
         
         if not review_texts:
             return {"key_points": [], "candidate_quotes": []}
         
         reviews_text = "\n\n---\n\n".join([
-            f"Review {i+1}: {text}"
-            for i, text in enumerate(review_texts)
+            f"Review {i+1}{f' (posted {count} times)' if count > 1 else ''}: {text}"
+            for i, (text, count) in enumerate(review_texts)
         ])
         
         prompt = f"""You are summarizing user reviews for a fintech app.
@@ -204,26 +302,138 @@ Keep everything concise. Avoid marketing fluff. Focus on what users are actually
         if not reviews:
             return {"key_points": [], "candidate_quotes": []}
         
-        # Chunk reviews
-        all_key_points = []
-        all_quotes = []
+        # Templated reviews ("Great app!") repeat verbatim; send each text
+        # once and tell the model how often it was posted
+        repeat_counts: Dict[str, int] = {}
+        unique_reviews = []
+        for review in reviews:
+            key = _review_key(review.cleaned_text or review.review_text or "")
+            if key in repeat_counts:
+                repeat_counts[key] += 1
+                continue
+            repeat_counts[key] = 1
+            unique_reviews.append(review)
+        
+        if len(unique_reviews) < len(reviews):
+            logger.info(f"Summarizing {len(unique_reviews)} distinct texts for {len(reviews)} {theme_name} reviews")
+        
+        chunks = list(self._pack_chunks(unique_reviews))
+        
+        # Chunk calls are independent, so overlap them; summarize_theme_chunk
+        # never raises, and map keeps the summaries in chunk order
+        summaries = self._map_parallel(
+            lambda chunk: self.summarize_theme_chunk(theme_name, chunk, repeat_counts), chunks
+        )
+        
+        # Reduce level by level so no single prompt sees more than
+        # SUMMARY_MERGE_FAN_IN summaries, and later chunks aren't cut off below
+        while len(summaries) > SUMMARY_MERGE_FAN_IN:
+            groups = [
+                summaries[i:i + SUMMARY_MERGE_FAN_IN]
+                for i in range(0, len(summaries), SUMMARY_MERGE_FAN_IN)
+            ]
+            logger.info(f"Merging {len(summaries)} summaries for {theme_name} in {len(groups)} groups")
+            summaries = self._map_parallel(
+                lambda group: self._merge_summaries(theme_name, group), groups
+            )
         
-        for i in range(0, len(reviews), self.chunk_size):
-            chunk = reviews[i:i + self.chunk_size]
-            chunk_summary = self.summarize_theme_chunk(theme_name, chunk)
-            all_key_points.extend(chunk_summary.get("key_points", []))
-            all_quotes.extend(chunk_summary.get("candidate_quotes", []))
+        return {"theme": theme_name, **self._combine_summaries(summaries)}
+    
+    def _pack_chunks(self, reviews: List[Review]) -> Iterator[List[Review]]:
+        """
+        Greedily pack reviews into chunks of roughly equal prompt size.
         
-        # Deduplicate and limit
-        unique_key_points = list(dict.fromkeys(all_key_points))[:5]  # Max 5 key points
-        unique_quotes = list(dict.fromkeys(all_quotes))[:5]  # Max 5 quotes
+        Short reviews share a chunk with more neighbours, long ones with fewer,
+        so each summarization call carries about chunk_token_budget tokens of
+        reviews (and never more than max_chunk_reviews reviews).
+        """
+        chunk: List[Review] = []
+        chunk_tokens = 0
+        for review in reviews:
+            text = review.cleaned_text or review.review_text or ""
+            tokens = min(len(text), REVIEW_CHAR_LIMIT) // CHARS_PER_TOKEN + REVIEW_TOKEN_OVERHEAD
+            if chunk and (chunk_tokens + tokens > self.chunk_token_budget
+                          or len(chunk) >= self.max_chunk_reviews):
+                yield chunk
+                chunk = []
+                chunk_tokens = 0
+            chunk.append(review)
+            chunk_tokens += tokens
+        if chunk:
+            yield chunk
+    
+    def _map_parallel(self, func, items: List[Any]) -> List[Any]:
+        """Apply func to each item on a small thread pool, keeping item order."""
+        if len(items) == 1:
+            return [func(items[0])]
+        with ThreadPoolExecutor(max_workers=min(LLM_MAX_CONCURRENCY, len(items))) as executor:
+            return list(executor.map(func, items))
+    
+    @staticmethod
+    def _combine_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatenate summaries, then deduplicate and limit (no LLM call)."""
+        all_key_points = []
+        all_quotes = []
+        for summary in summaries:
+            all_key_points.extend(summary.get("key_points", []))
+            all_quotes.extend(summary.get("candidate_quotes", []))
         
+        # Deduplicate (including reworded repeats across chunks) and limit
         return {
-            "theme": theme_name,
-            "key_points": unique_key_points,
-            "candidate_quotes": unique_quotes
+            "key_points": dedupe_near_duplicates(all_key_points, 5),  # Max 5 key points
+            "candidate_quotes": dedupe_near_duplicates(all_quotes, 5)  # Max 5 quotes
         }
     
+    def _merge_summaries(
+        self,
+        theme_name: str,
+        summaries: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Merge several chunk summaries of one theme into a single summary.
+        
+        Args:
+            theme_name: Name of the theme
+            summaries: Summaries with key_points and candidate_quotes
+            
+        Returns:
+            Dictionary with key_points and candidate_quotes
+        """
+        summaries_json = _prompt_json(
+            [{"key_points": s.get("key_points", []), "candidate_quotes": s.get("candidate_quotes", [])}
+             for s in summaries]
+        )
+        
+        prompt = f"""You are merging partial summaries of user reviews for a fintech app.
+
+Theme: {theme_name}
+
+Partial summaries (each covers a different set of reviews):
+{summaries_json}
+
+Tasks:
+1. Combine them into 3–5 key points, merging overlapping points and keeping the most frequent concerns.
+2. Keep up to 3 of the most vivid, representative quotes, unchanged. No PII.
+
+3. Return JSON:
+{{
+  "theme": "{theme_name}",
+  "key_points": ["point 1", "point 2", "..."],
+  "candidate_quotes": ["quote 1", "quote 2", "quote 3"]
+}}"""
+        
+        try:
+            response_text = self._call_gemini(prompt)
+            result = json.loads(response_text)
+            return {
+                "key_points": result.get("key_points", []),
+                "candidate_quotes": result.get("candidate_quotes", [])
+            }
+        except Exception as e:
+            logger.error(f"Error merging summaries for {theme_name}: {e}")
+            # Fallback: keep the first points and quotes, as without merging
+            return self._combine_summaries(summaries)
+    
     def generate_weekly_pulse(
         self,
         week_start: datetime,
@@ -242,7 +452,7 @@ Keep everything concise. Avoid marketing fluff. Focus on what users are actually
             Dictionary with weekly pulse content
         """
         # Prepare input JSON
-        summaries_json = json.dumps(theme_summaries, indent=2)
+        summaries_json = _prompt_json(theme_summaries)
         
         week_start_str = week_start.strftime("%B %d, %Y")
         week_end_str = week_end.strftime("%B %d, %Y")
@@ -317,22 +527,21 @@ Output in this JSON structure:
             Compressed report dictionary
         """
         # Calculate word count
-        text_parts = [
-            report.get("title", ""),
-            report.get("overview", ""),
-            " ".join([t.get("summary", "") for t in report.get("themes", [])]),
-            " ".join([q.get("text", "") for q in report.get("quotes", [])]),
-            " ".join([a.get("text", "") for a in report.get("actions", [])])
-        ]
-        total_text = " ".join(text_parts)
-        word_count = len(total_text.split())
-        
-        if word_count <= 250:
+        word_count = report_word_count(report)
+        
+        if word_count <= REPORT_MAX_WORDS:
             return report
         
+        # A small overshoot isn't worth an LLM round-trip
+        if word_count < LOCAL_TRIM_MAX_WORDS:
+            trimmed = trim_report(report)
+            if trimmed is not None:
+                logger.info(f"Report is {word_count} words, trimmed locally to {report_word_count(trimmed)}")
+                return trimmed
+        
         logger.info(f"Report is {word_count} words, compressing to ≤250 words")
         
-        report_json = json.dumps(report, indent=2)
+        report_json = _prompt_json(report)
         prompt = f"""Compress this note to at most 250 words, preserving:
 - 3 themes, 3 quotes, 3 actions.
 - Bullet-based, scannable structure.
@@ -382,15 +591,13 @@ Return the compressed version in the same JSON structure."""
             }
         
         # Step 2: Summarize each theme
-        theme_summaries = []
-        import time
-        
+        # Themes are independent, so summarize them concurrently; pacing and
+        # the in-flight cap come from _call_gemini
         for theme_name, reviews in theme_reviews.items():
             logger.info(f"Summarizing theme: {theme_name} ({len(reviews)} reviews)")
-            summary = self.summarize_theme(theme_name, reviews)
-            theme_summaries.append(summary)
-            # Rate limiting delay
-            time.sleep(4.5)
+        
+        with ThreadPoolExecutor(max_workers=len(theme_reviews)) as executor:
+            theme_summaries = list(executor.map(self.summarize_theme, theme_reviews, theme_reviews.values()))
         
         # Step 3: Generate weekly pulse
         logger.info("Generating final weekly pulse...")
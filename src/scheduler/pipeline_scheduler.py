@@ -2,9 +2,9 @@
 import logging
 from datetime import datetime, time
 from typing import Optional
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
-from src.orchestrator.weekly_pipeline import WeeklyPipeline
 from config.settings import get_settings
 
 logger = logging.getLogger(__name__)
@@ -26,7 +26,16 @@ class PipelineScheduler:
             api_key: Google API key (default: from settings)
             skip_email: If True, skip email sending in scheduled runs
         """
-        self.scheduler = BlockingScheduler()
+        # The process only waits for the weekly job, so blocking the main thread
+        # is free; run jobs on a single worker and never overlap or replay runs
+        self.scheduler = BlockingScheduler(
+            executors={"default": ThreadPoolExecutor(max_workers=1)},
+            job_defaults={
+                "coalesce": True,  # Collapse missed runs into one
+                "max_instances": 1,
+                "misfire_grace_time": 3600  # Still run if the process was busy/asleep < 1h
+            }
+        )
         self.api_key = api_key or settings.google_api_key
         self.skip_email = skip_email
         
@@ -78,6 +87,9 @@ class PipelineScheduler:
             logger.info(f"SCHEDULED PIPELINE EXECUTION - {datetime.now()}")
             logger.info("=" * 70)
             try:
+                # Imported per run so the scheduler process starts (and idles all week)
+                # without loading the scrapers, Gemini SDK and email stack
+                from src.orchestrator.weekly_pipeline import WeeklyPipeline
                 pipeline = WeeklyPipeline(api_key=self.api_key, skip_email=self.skip_email)
                 results = pipeline.execute()
                 if results.get("success"):
@@ -1,9 +1,7 @@
 """Task to generate weekly reports."""
 import logging
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.database.models import Base
+from src.database.engine import ensure_schema, get_engine, get_sessionmaker
 from src.llm.gemini_client import GeminiClient
 from src.reporting.weekly_report_generator import WeeklyReportGenerator
 from config.settings import get_settings
@@ -22,10 +20,10 @@ class GenerateWeeklyReportTask:
         self.database_url = database_url or f"sqlite:///{sqlite_db_path}"
         logger.info(f"Using database for report generation: {self.database_url}")
         
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        self.engine = get_engine(self.database_url)
+        self.SessionLocal = get_sessionmaker(self.database_url)
         
-        Base.metadata.create_all(self.engine)
+        ensure_schema(self.database_url)
         
         self.api_key = api_key or settings.google_api_key
         if not self.api_key:
@@ -84,6 +82,7 @@ class GenerateWeeklyReportTask:
             raise
         finally:
             session.close()
+            self.gemini_client.close()
 
 
 def run_generate_report(
@@ -1,9 +1,8 @@
 """Task to send weekly report emails."""
 import logging
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.database.models import Base, WeeklyReport
+from src.database.models import WeeklyReport
+from src.database.engine import ensure_schema, get_engine, get_sessionmaker
 from src.llm.gemini_client import GeminiClient
 from src.email.email_draft_generator import EmailDraftGenerator
 from src.email.email_sender import EmailSender
@@ -29,10 +28,10 @@ class SendWeeklyEmailTask:
         self.database_url = database_url or f"sqlite:///{sqlite_db_path}"
         logger.info(f"Using database: {self.database_url}")
         
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        self.engine = get_engine(self.database_url)
+        self.SessionLocal = get_sessionmaker(self.database_url)
         
-        Base.metadata.create_all(self.engine)
+        ensure_schema(self.database_url)
         
         self.api_key = api_key or settings.google_api_key
         if not self.api_key:
@@ -138,6 +137,9 @@ class SendWeeklyEmailTask:
             raise
         finally:
             session.close()
+            # The sender keeps its SMTP login open between sends; release it with the run
+            self.email_sender.close()
+            self.gemini_client.close()
 
 
 def run_send_email(
@@ -1,6 +1,6 @@
 """Utilities package."""
 from src.utils.pii_remover import PIIRemover
 from src.utils.language_detector import LanguageDetector
+from src.utils.rate_limiter import TokenBucket
 
-__all__ = ["PIIRemover", "LanguageDetector"]
-
+__all__ = ["PIIRemover", "LanguageDetector", "TokenBucket"]
@@ -1,13 +1,27 @@
 """Language detection utility using standard library only."""
 import re
-from typing import Optional
+from typing import List, Optional
+
+
+# Non-English scripts (Unicode ranges), one character class so a single scan covers all
+_NON_ENGLISH_SCRIPT = re.compile(
+    r'['
+    r'\u0600-\u06FF'  # Arabic
+    r'\u0900-\u097F'  # Devanagari: Hindi, Marathi, etc.
+    r'\u0E00-\u0E7F'  # Thai
+    r'\u4E00-\u9FFF'  # Chinese characters
+    r']'
+)
+
+_WORD = re.compile(r'\b\w+\b')
+_ENGLISH_WORD = re.compile(r'\b[a-z]+\b')  # Applied to lowercased text
 
 
 class LanguageDetector:
     """Detect if text is in English using heuristics."""
     
     # Common English words for validation
-    COMMON_ENGLISH_WORDS = {
+    COMMON_ENGLISH_WORDS = frozenset({
         'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
         'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
         'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
@@ -20,13 +34,12 @@ class LanguageDetector:
         'well', 'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day',
         'most', 'us', 'app', 'good', 'great', 'very', 'much', 'more', 'best', 'easy',
         'love', 'like', 'nice', 'excellent', 'amazing', 'awesome', 'perfect', 'wonderful'
-    }
+    })
     
-    # Non-English character ranges (Unicode)
-    DEVANAGARI_RANGE = re.compile(r'[\u0900-\u097F]')  # Hindi, Marathi, etc.
-    CHINESE_RANGE = re.compile(r'[\u4E00-\u9FFF]')  # Chinese characters
-    ARABIC_RANGE = re.compile(r'[\u0600-\u06FF]')  # Arabic
-    THAI_RANGE = re.compile(r'[\u0E00-\u0E7F]')  # Thai
+    # Public aliases of the module-level patterns
+    NON_ENGLISH_SCRIPT_PATTERN = _NON_ENGLISH_SCRIPT
+    WORD_PATTERN = _WORD
+    ENGLISH_WORD_PATTERN = _ENGLISH_WORD
     
     @classmethod
     def is_english(cls, text: str, min_confidence: float = 0.5) -> bool:
@@ -40,45 +53,64 @@ class LanguageDetector:
         Returns:
             True if text appears to be English
         """
-        if not text or not text.strip():
-            return False
-        
-        text_lower = text.lower()
-        words = re.findall(r'\b[a-z]+\b', text_lower)
-        
-        if not words:
-            return False
-        
-        # Check for non-English scripts
-        if (cls.DEVANAGARI_RANGE.search(text) or
-            cls.CHINESE_RANGE.search(text) or
-            cls.ARABIC_RANGE.search(text) or
-            cls.THAI_RANGE.search(text)):
-            return False
-        
-        # Check ratio of common English words
-        english_word_count = sum(1 for word in words if word in cls.COMMON_ENGLISH_WORDS)
-        total_words = len(words)
-        
-        if total_words == 0:
-            return False
-        
-        english_ratio = english_word_count / total_words
-        
-        # Also check if text is mostly ASCII (English uses ASCII)
-        ascii_chars = sum(1 for c in text if ord(c) < 128)
-        ascii_ratio = ascii_chars / len(text) if text else 0
-        
-        # Combined confidence
-        confidence = (english_ratio * 0.6) + (ascii_ratio * 0.4)
-        
-        return confidence >= min_confidence
+        return cls.is_english_batch([text], min_confidence)[0]
     
     @classmethod
     def count_words(cls, text: str) -> int:
         """Count words in text."""
         if not text:
             return 0
-        words = re.findall(r'\b\w+\b', text)
+        words = _WORD.findall(text)
         return len(words)
+    
+    @classmethod
+    def count_words_batch(cls, texts: List[str]) -> List[int]:
+        """Count words in each of several texts."""
+        findall = _WORD.findall
+        return [len(findall(text)) if text else 0 for text in texts]
+    
+    @classmethod
+    def is_english_batch(cls, texts: List[str], min_confidence: float = 0.5) -> List[bool]:
+        """
+        Detect English for each of several texts (see is_english).
+        
+        The heuristic runs inline with patterns and the word set bound once,
+        so a batch pays no per-text method call or attribute lookups.
+        """
+        find_words = _ENGLISH_WORD.findall
+        find_script = _NON_ENGLISH_SCRIPT.search
+        is_common_word = cls.COMMON_ENGLISH_WORDS.__contains__
+        
+        results = []
+        append_result = results.append
+        for text in texts:
+            if not text or not text.strip():
+                append_result(False)
+                continue
+            
+            words = find_words(text.lower())
+            if not words:
+                append_result(False)
+                continue
+            
+            # Pure-ASCII text (the common case) cannot contain non-Latin scripts;
+            # str.isascii() is O(1) in CPython, so skip the script scan and ratio count
+            if text.isascii():
+                ascii_ratio = 1.0
+            else:
+                # Check for non-English scripts
+                if find_script(text):
+                    append_result(False)
+                    continue
+                # Encoding drops the non-ASCII characters in C instead of a per-character loop
+                ascii_ratio = len(text.encode('ascii', 'ignore')) / len(text)
+            
+            # Check ratio of common English words
+            english_ratio = sum(map(is_common_word, words)) / len(words)
+            
+            # Combined confidence
+            confidence = (english_ratio * 0.6) + (ascii_ratio * 0.4)
+            append_result(confidence >= min_confidence)
+        
+        return results
 
@@ -1,6 +1,6 @@
 """PII removal and text cleaning utilities."""
 import re
-from typing import Optional
+from typing import List, Optional, Tuple
 
 # Try to import optional dependencies
 try:
@@ -15,51 +15,87 @@ try:
 except ImportError:
     HAS_BS4 = False
 
+try:
+    import lxml  # Only needed as a BeautifulSoup parser backend
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# lxml's C parser is several times faster than the pure-Python html.parser
+HTML_PARSER = 'lxml' if HAS_LXML else 'html.parser'
+
+
+# Patterns live at module scope so the per-review methods reach them as globals
+# rather than through class attribute lookups
+
+# Regex patterns for PII detection
+_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_INDIAN_PHONE = re.compile(r'(\+91[-.\s]?)?[6-9]\d{9}')
+_URL = re.compile(r'https?://[^\s<>"]+', re.IGNORECASE)
+_HTML_TAG = re.compile('<.*?>')  # Fallback when BeautifulSoup is unavailable
+# Cheap prefilter: phone patterns can only match text containing a digit
+_DIGIT = re.compile(r'\d')
+_WHITESPACE = re.compile(r'\s+')
+# Basic emoji removal using Unicode ranges, when the emoji package is missing
+_EMOJI = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+", flags=re.UNICODE
+)
+# Curly double/single quotes to straight ones, as explicit code points
+_QUOTE_TABLE = str.maketrans({
+    '\u201c': '"',
+    '\u201d': '"',
+    '\u2018': "'",
+    '\u2019': "'",
+})
+
 
 class PIIRemover:
     """Remove PII and clean text from reviews."""
     
-    # Regex patterns for PII detection
-    EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-    PHONE_PATTERN = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
-    INDIAN_PHONE_PATTERN = re.compile(r'(\+91[-.\s]?)?[6-9]\d{9}')
-    URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+    # Public aliases of the module-level patterns
+    EMAIL_PATTERN = _EMAIL
+    PHONE_PATTERN = _PHONE
+    INDIAN_PHONE_PATTERN = _INDIAN_PHONE
+    URL_PATTERN = _URL
+    HTML_TAG_PATTERN = _HTML_TAG
+    DIGIT_PATTERN = _DIGIT
+    WHITESPACE_PATTERN = _WHITESPACE
+    EMOJI_PATTERN = _EMOJI
+    QUOTE_TABLE = _QUOTE_TABLE
     
     @classmethod
     def remove_emails(cls, text: str) -> str:
         """Remove email addresses from text."""
-        return cls.EMAIL_PATTERN.sub('[EMAIL_REMOVED]', text)
+        return _EMAIL.sub('[EMAIL_REMOVED]', text)
     
     @classmethod
     def remove_phones(cls, text: str) -> str:
         """Remove phone numbers from text."""
-        text = cls.PHONE_PATTERN.sub('[PHONE_REMOVED]', text)
-        text = cls.INDIAN_PHONE_PATTERN.sub('[PHONE_REMOVED]', text)
+        text = _PHONE.sub('[PHONE_REMOVED]', text)
+        text = _INDIAN_PHONE.sub('[PHONE_REMOVED]', text)
         return text
     
     @classmethod
     def remove_urls(cls, text: str) -> str:
         """Remove URLs from text."""
-        return cls.URL_PATTERN.sub('[URL_REMOVED]', text)
+        return _URL.sub('[URL_REMOVED]', text)
     
     @classmethod
     def remove_emojis(cls, text: str) -> str:
         """Remove emojis from text."""
+        if text.isascii():
+            return text  # Emojis are never ASCII
         if HAS_EMOJI:
             return emoji.replace_emoji(text, replace='')
-        else:
-            # Basic emoji removal using regex (Unicode ranges)
-            emoji_pattern = re.compile(
-                "["
-                "\U0001F600-\U0001F64F"  # emoticons
-                "\U0001F300-\U0001F5FF"  # symbols & pictographs
-                "\U0001F680-\U0001F6FF"  # transport & map symbols
-                "\U0001F1E0-\U0001F1FF"  # flags
-                "\U00002702-\U000027B0"
-                "\U000024C2-\U0001F251"
-                "]+", flags=re.UNICODE
-            )
-            return emoji_pattern.sub('', text)
+        return _EMOJI.sub('', text)
     
     @classmethod
     def strip_html(cls, text: str) -> str:
@@ -67,29 +103,26 @@ class PIIRemover:
         if not text:
             return text
         if HAS_BS4:
-            soup = BeautifulSoup(text, 'html.parser')
+            if '<' not in text and '&' not in text:
+                # No tags or entities: parsing would only strip the surrounding whitespace
+                return text.strip()
+            soup = BeautifulSoup(text, HTML_PARSER)
             return soup.get_text(separator=' ', strip=True)
         else:
             # Basic HTML tag removal using regex
-            html_pattern = re.compile('<.*?>')
-            return html_pattern.sub('', text)
+            return _HTML_TAG.sub('', text)
     
     @classmethod
     def normalize_whitespace(cls, text: str) -> str:
         """Normalize whitespace in text."""
-        # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
-        # Replace multiple newlines with single newline
-        text = re.sub(r'\n+', '\n', text)
-        return text.strip()
+        # Collapse every whitespace run (newlines included) to a single space
+        return _WHITESPACE.sub(' ', text).strip()
     
     @classmethod
     def normalize_quotes(cls, text: str) -> str:
         """Normalize different quote types to standard quotes."""
-        # Replace curly quotes with straight quotes
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(''', "'").replace(''', "'")
-        return text
+        # Replace curly quotes with straight quotes in one pass
+        return text.translate(_QUOTE_TABLE)
     
     @classmethod
     def clean_text(cls, text: str, remove_emojis_flag: bool = True) -> str:
@@ -103,35 +136,73 @@ class PIIRemover:
         Returns:
             Cleaned text with PII removed
         """
+        return cls.clean_and_detect(text, remove_emojis_flag)[0]
+    
+    @classmethod
+    def clean_and_detect(cls, text: str, remove_emojis_flag: bool = True) -> Tuple[str, bool]:
+        """
+        Clean text and report whether any email or phone number was removed.
+        
+        Equivalent to calling clean_text and contains_pii, but each PII regex
+        scans the text only once (substitution counts drive the flag), and
+        only when the text has the character it needs to match ('@', a digit,
+        '://'); most reviews have none and skip the regex scans entirely.
+        
+        Args:
+            text: Raw text to clean
+            remove_emojis_flag: Whether to remove emojis (default: True)
+        
+        Returns:
+            Tuple of (cleaned text, whether PII was found)
+        """
         if not text:
-            return ""
+            return "", False
         
         # Step 1: Remove HTML tags
         text = cls.strip_html(text)
         
         # Step 2: Remove PII
-        text = cls.remove_emails(text)
-        text = cls.remove_phones(text)
-        text = cls.remove_urls(text)
+        email_count = phone_count = indian_phone_count = 0
+        if '@' in text:
+            text, email_count = _EMAIL.subn('[EMAIL_REMOVED]', text)
+        if _DIGIT.search(text):
+            text, phone_count = _PHONE.subn('[PHONE_REMOVED]', text)
+            text, indian_phone_count = _INDIAN_PHONE.subn('[PHONE_REMOVED]', text)
+        if '://' in text:
+            text = _URL.sub('[URL_REMOVED]', text)
+        found_pii = bool(email_count or phone_count or indian_phone_count)
         
         # Step 3: Remove emojis (optional)
         if remove_emojis_flag:
             text = cls.remove_emojis(text)
         
         # Step 4: Normalize quotes
-        text = cls.normalize_quotes(text)
+        text = text.translate(_QUOTE_TABLE)
         
         # Step 5: Normalize whitespace
-        text = cls.normalize_whitespace(text)
+        text = _WHITESPACE.sub(' ', text).strip()
         
-        return text
+        return text, found_pii
+    
+    @classmethod
+    def clean_and_detect_batch(
+        cls,
+        texts: List[str],
+        remove_emojis_flag: bool = True
+    ) -> List[Tuple[str, bool]]:
+        """Run clean_and_detect over several texts in one call."""
+        clean_and_detect = cls.clean_and_detect
+        return [clean_and_detect(text, remove_emojis_flag) for text in texts]
     
     @classmethod
     def contains_pii(cls, text: str) -> bool:
         """Check if text contains potential PII."""
-        if cls.EMAIL_PATTERN.search(text):
+        # Same prefilters as clean_and_detect: text without '@' or a digit skips the scans
+        if '@' in text and _EMAIL.search(text):
             return True
-        if cls.PHONE_PATTERN.search(text) or cls.INDIAN_PHONE_PATTERN.search(text):
+        if _DIGIT.search(text) and (
+            _PHONE.search(text) or _INDIAN_PHONE.search(text)
+        ):
             return True
         return False
 